@@ -5,6 +5,13 @@ from flask_jwt_extended import JWTManager
 from flask_cors import CORS
 from dotenv import load_dotenv
 from flask_migrate import Migrate
+from .compression import compressor
+from .conditional import conditional_get
+from .config import engine_options, sqlite_pragmas
+from .encoding import response_encoder
+from .hashing import password_hasher
+from .metrics import init_metrics, timed_encoder
+from .serving import serve_command
 import os
 
 db = SQLAlchemy()
@@ -27,8 +34,11 @@ api = Api(
     description='API for the Workout App',
     authorizations=authorizations,
     security='BearerAuth',  # Apply globally
-    doc='/api/docs/'
+    doc='/api/docs/',
+    decorators=[conditional_get]  # ETag / If-None-Match on marked GETs
 )
+# Record JSON encoding time separately from the handler in /metrics
+api.representations['application/json'] = timed_encoder(response_encoder.output_json)
 
 def create_app():
     app = Flask(__name__)
@@ -38,6 +48,9 @@ def create_app():
     app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv(
         'DATABASE_URL', 'sqlite:///workout.db')
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(
+        app.config['SQLALCHEMY_DATABASE_URI'])
+    app.config['SQLITE_PRAGMAS'] = sqlite_pragmas()
     app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY')
 
     if not app.config['JWT_SECRET_KEY']:
@@ -47,6 +60,21 @@ def create_app():
     db.init_app(app)
     jwt.init_app(app)
     migrate.init_app(app, db)
+    password_hasher.init_app(app)
+    response_encoder.init_app(app)
+    init_metrics(app)
+    compressor.init_app(app)
+    from .dashboard import dashboard
+    dashboard.init_app(app)
+
+    # CLI commands
+    app.cli.add_command(serve_command)
+    from .training_stats import stats_command
+    app.cli.add_command(stats_command)
+    from .sync import init_sync
+    init_sync(app)
+    from .idempotency import init_idempotency
+    init_idempotency(app)
 
     # Configure CORS
     CORS(app, resources={r"/api/*": {"origins": "*"}})
@@ -62,6 +90,11 @@ def create_app():
     from .routes.exercise_goals import exercises_goals_ns
     from .routes.workout_session import workout_sessions_ns
     from .routes.fitness_goals import fitness_goals_ns
+    from .routes.health import health_ns
+    from .routes.analytics import analytics_ns
+    from .routes.batch import batch_ns
+    from .routes.sync import sync_ns
+    from .routes.dashboard import dashboard_ns
     api.add_namespace(user_ns, path='/api/user')
     api.add_namespace(exercises_ns, path='/api/exercises')
     api.add_namespace(workout_plans_ns, path='/api/workout-plans')
@@ -69,6 +102,11 @@ def create_app():
     api.add_namespace(exercises_goals_ns, path='/api/exercise-goals')
     api.add_namespace(workout_sessions_ns, path='/api/workout-sessions')
     api.add_namespace(fitness_goals_ns, path='/api/fitness-goals')
+    api.add_namespace(health_ns, path='/api/health')
+    api.add_namespace(analytics_ns, path='/api/analytics')
+    api.add_namespace(batch_ns, path='/api/batch')
+    api.add_namespace(sync_ns, path='/api/sync')
+    api.add_namespace(dashboard_ns, path='/api/dashboard')
 
 
     return app
\ No newline at end of file
@@ -0,0 +1,166 @@
+"""
+Training analytics computed with SQL aggregates.
+
+Every query reads one user's rows through the ``(user_id, date)`` index
+on ``workout_sessions`` and returns only aggregated rows, so responses
+stay small no matter how long the history is. Date bucketing differs
+between databases and is compiled per dialect: ``date_trunc`` on
+PostgreSQL and ``date()`` modifiers on SQLite.
+"""
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import Date, Integer, func, select
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+
+from app import db
+from app.models import WorkoutPlan, WorkoutSession
+
+
+class week_start(FunctionElement):
+    """Monday of the week containing a timestamp."""
+    type = Date()
+    inherit_cache = True
+
+
+class month_start(FunctionElement):
+    """First day of the month containing a timestamp."""
+    type = Date()
+    inherit_cache = True
+
+
+@compiles(week_start)
+def _week_start(element, compiler, **kw):
+    return f"CAST(date_trunc('week', {compiler.process(element.clauses, **kw)}) AS DATE)"
+
+
+@compiles(week_start, 'sqlite')
+def _week_start_sqlite(element, compiler, **kw):
+    # Forward to Sunday (or stay on it), then back to Monday.
+    return f"date({compiler.process(element.clauses, **kw)}, 'weekday 0', '-6 days')"
+
+
+@compiles(month_start)
+def _month_start(element, compiler, **kw):
+    return f"CAST(date_trunc('month', {compiler.process(element.clauses, **kw)}) AS DATE)"
+
+
+@compiles(month_start, 'sqlite')
+def _month_start_sqlite(element, compiler, **kw):
+    return f"date({compiler.process(element.clauses, **kw)}, 'start of month')"
+
+
+PERIODS = {'week': week_start, 'month': month_start}
+
+
+class day_number(FunctionElement):
+    """Whole days since a fixed epoch, for arithmetic on calendar days."""
+    type = Integer()
+    inherit_cache = True
+
+
+@compiles(day_number)
+def _day_number(element, compiler, **kw):
+    expr = compiler.process(element.clauses, **kw)
+    return f"(CAST({expr} AS DATE) - DATE '1970-01-01')"
+
+
+@compiles(day_number, 'sqlite')
+def _day_number_sqlite(element, compiler, **kw):
+    expr = compiler.process(element.clauses, **kw)
+    return f"CAST(julianday(date({expr})) - 2440587.5 AS INTEGER)"
+
+
+EPOCH = date(1970, 1, 1)
+
+
+def _sessions(user_id, start=None, end=None):
+    """WHERE clauses for a user's sessions with `start` <= date < `end` + 1 day."""
+    clauses = [WorkoutSession.user_id == user_id]
+    if start is not None:
+        clauses.append(WorkoutSession.date >= start)
+    if end is not None:
+        clauses.append(WorkoutSession.date < end + timedelta(days=1))
+    return clauses
+
+
+def period_totals(user_id, period, start=None, end=None):
+    """Session count and total duration per week or month, oldest first."""
+    bucket = PERIODS[period](WorkoutSession.date).label('start')
+    rows = db.session.execute(
+        select(bucket,
+               func.count().label('sessions'),
+               func.coalesce(func.sum(WorkoutSession.duration), 0).label('total_duration'))
+        .where(*_sessions(user_id, start, end))
+        .group_by(bucket)
+        .order_by(bucket))
+    return [{'start': row.start, 'sessions': row.sessions,
+             'total_duration': row.total_duration} for row in rows]
+
+
+def plan_breakdown(user_id, start=None, end=None):
+    """Per-plan session count, duration and last session, busiest first."""
+    stats = (
+        select(WorkoutSession.workout_plan_id,
+               func.count().label('sessions'),
+               func.coalesce(func.sum(WorkoutSession.duration), 0).label('total_duration'),
+               func.max(WorkoutSession.date).label('last_session'))
+        .where(*_sessions(user_id, start, end))
+        .group_by(WorkoutSession.workout_plan_id)
+        .subquery())
+    rows = db.session.execute(
+        select(stats, WorkoutPlan.name)
+        .join(WorkoutPlan, WorkoutPlan.id == stats.c.workout_plan_id)
+        .order_by(stats.c.sessions.desc(), stats.c.workout_plan_id))
+    return [{
+        'workout_plan_id': row.workout_plan_id,
+        'name': row.name,
+        'sessions': row.sessions,
+        'total_duration': row.total_duration,
+        'average_duration': round(row.total_duration / row.sessions, 1),
+        'last_session': row.last_session,
+    } for row in rows]
+
+
+def streaks(user_id, today=None):
+    """
+    Current and longest runs of consecutive training days and weeks.
+
+    Uses the gaps-and-islands technique: numbering the distinct days (or
+    weeks) in order, ``unit - row_number`` is constant within a run, so
+    each run is one GROUP BY bucket. A run is current if it reaches
+    today or the day (week) before; days are UTC, like session dates.
+    """
+    today = today or datetime.utcnow().date()
+    days = select(day_number(WorkoutSession.date).label('unit')).where(
+        *_sessions(user_id)).distinct().subquery()
+    weeks = select(
+        (day_number(week_start(WorkoutSession.date)) // 7).label('unit')).where(
+        *_sessions(user_id)).distinct().subquery()
+
+    today_number = (today - EPOCH).days
+    return {
+        'daily': _runs(days, today_number),
+        'weekly': _runs(weeks, (today_number - today.weekday()) // 7),
+    }
+
+
+def _runs(units, current):
+    numbered = select(
+        units.c.unit,
+        (units.c.unit - func.row_number().over(order_by=units.c.unit)).label('run'),
+    ).subquery()
+    runs = select(
+        func.max(numbered.c.unit).label('last'),
+        func.count().label('length'),
+    ).group_by(numbered.c.run).subquery()
+
+    latest = db.session.execute(
+        select(runs.c.last, runs.c.length,
+               func.max(runs.c.length).over().label('longest'))
+        .order_by(runs.c.last.desc()).limit(1)).first()
+    if latest is None:
+        return {'current': 0, 'longest': 0}
+    is_current = latest.last >= current - 1
+    return {'current': latest.length if is_current else 0, 'longest': latest.longest}
+
@@ -0,0 +1,115 @@
+"""
+Read-through cache for the exercise catalog.
+
+The catalog only changes when exercises are written (normally by
+``load_exercises.py``), so list and detail responses are cached as
+pre-serialized JSON bytes and served straight from memory.
+
+Entries are tagged with the catalog version stored in the
+``catalog_version`` table. Any flush that touches an ``Exercises`` row
+bumps that version in the same transaction; bulk writers that bypass the
+ORM unit of work must call ``bump_catalog_version`` themselves. Writes made
+by this process invalidate the cache on commit; writes made by other
+processes are picked up once ``CATALOG_VERSION_TTL`` seconds have passed
+since the version was last read.
+"""
+import threading
+import time
+
+from flask import current_app
+from sqlalchemy import event, select, update, insert
+from sqlalchemy.orm import Session
+
+from app import db
+from app.encoding import response_encoder
+from app.metrics import timed_encoder
+from app.models import CatalogVersion, Exercises
+
+
+def bump_catalog_version(connection):
+    """Increment the catalog version using the given connection."""
+    table = CatalogVersion.__table__
+    result = connection.execute(
+        update(table).where(table.c.id == 1)
+        .values(version=table.c.version + 1))
+    if result.rowcount == 0:
+        connection.execute(insert(table).values(id=1, version=1))
+
+
+class CatalogCache:
+    """Versioned store of serialized catalog responses."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._version = None
+        self._checked_at = 0.0
+
+    def version(self):
+        """Return the current catalog version, re-reading it after the TTL."""
+        ttl = current_app.config.get('CATALOG_VERSION_TTL', 5)
+        now = time.monotonic()
+        if self._version is None or now - self._checked_at >= ttl:
+            version = db.session.execute(
+                select(CatalogVersion.version).where(CatalogVersion.id == 1)
+            ).scalar() or 0
+            with self._lock:
+                if version != self._version:
+                    self._entries.clear()
+                self._version = version
+                self._checked_at = now
+        return self._version
+
+    def get(self, key, build, cache_empty=True):
+        """
+        Return the cached bytes for `key`, calling `build()` on a miss.
+
+        `build` returns the JSON bytes to cache, or None if there is
+        nothing to serve; None results are only cached when `cache_empty`
+        is true.
+        """
+        version = self.version()
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+
+        body = build()
+        if body is not None or cache_empty:
+            with self._lock:
+                if self._version == version:
+                    self._entries[key] = (version, body)
+        return body
+
+    def invalidate(self):
+        """Drop all entries and force the version to be re-read."""
+        with self._lock:
+            self._entries.clear()
+            self._version = None
+
+
+catalog_cache = CatalogCache()
+
+
+@timed_encoder
+def serialize(data):
+    return response_encoder.dumps(data)
+
+
+@event.listens_for(Session, 'after_flush')
+def _bump_on_exercise_write(session, flush_context):
+    changed = session.new | session.dirty | session.deleted
+    if any(isinstance(obj, Exercises) for obj in changed):
+        bump_catalog_version(session.connection())
+        session.info['catalog_changed'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_on_commit(session):
+    if session.info.pop('catalog_changed', False):
+        catalog_cache.invalidate()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_on_rollback(session):
+    session.info.pop('catalog_changed', None)
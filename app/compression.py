@@ -0,0 +1,121 @@
+"""
+Response compression negotiated via ``Accept-Encoding``.
+
+Responses are compressed with Brotli (when the ``brotli`` package is
+installed) or gzip if the client accepts it, the content type is in
+``COMPRESS_MIMETYPES`` and the body is at least ``COMPRESS_MIN_SIZE``
+bytes. Compressed responses get ``Vary: Accept-Encoding`` and their ETag
+is made weak, as the bytes differ from the identity encoding; conditional
+GET compares tags weakly, so revalidation still answers 304.
+
+Responses marked with ``precompressed()`` (immutable bodies tagged with a
+version ETag, such as the exercise catalog) keep their compressed forms
+in a per-process cache keyed by URL, ETag and encoding, and are
+compressed at the highest level since that happens once per version.
+
+Configuration (``app.config``):
+
+- ``COMPRESS_MIN_SIZE``: smallest body worth compressing, in bytes
+  (default 1024).
+- ``COMPRESS_MIMETYPES``: content types to compress (JSON, text, JS, CSS).
+- ``COMPRESS_GZIP_LEVEL``: gzip level for dynamic responses (default 6).
+- ``COMPRESS_BROTLI_QUALITY``: Brotli quality for dynamic responses
+  (default 4).
+- ``COMPRESS_CACHE_SIZE``: precompressed bodies kept (default 256).
+"""
+import gzip
+import os
+
+from flask import request
+
+from app.cache import TTLCache
+
+try:
+    import brotli
+except ImportError:  # optional, see requirements.txt
+    brotli = None
+
+
+DEFAULT_MIMETYPES = (
+    'application/json',
+    'application/javascript',
+    'text/css',
+    'text/html',
+    'text/javascript',
+    'text/plain',
+)
+
+# Entries are keyed by ETag, so they never go stale; the TTL only bounds
+# how long versions nobody asks for anymore stay around.
+PRECOMPRESSED_TTL = 3600
+
+
+def precompressed(response):
+    """Mark `response` as immutable for its ETag so compressed bodies are reused."""
+    response.precompressed = True
+    return response
+
+
+class Compressor:
+    def __init__(self):
+        self._cache = TTLCache(maxsize=256, ttl=PRECOMPRESSED_TTL)
+
+    def init_app(self, app):
+        config = app.config
+        config.setdefault('COMPRESS_MIN_SIZE', int(os.getenv('COMPRESS_MIN_SIZE', 1024)))
+        config.setdefault('COMPRESS_MIMETYPES', DEFAULT_MIMETYPES)
+        config.setdefault('COMPRESS_GZIP_LEVEL', int(os.getenv('COMPRESS_GZIP_LEVEL', 6)))
+        config.setdefault('COMPRESS_BROTLI_QUALITY',
+                          int(os.getenv('COMPRESS_BROTLI_QUALITY', 4)))
+        config.setdefault('COMPRESS_CACHE_SIZE', int(os.getenv('COMPRESS_CACHE_SIZE', 256)))
+
+        self._cache = TTLCache(maxsize=config['COMPRESS_CACHE_SIZE'], ttl=PRECOMPRESSED_TTL)
+        self.encodings = ['br', 'gzip'] if brotli is not None else ['gzip']
+
+        @app.after_request
+        def _compress_response(response):
+            return self.compress_response(response, config)
+
+    def compress(self, data, encoding, gzip_level, brotli_quality):
+        if encoding == 'br':
+            return brotli.compress(data, quality=brotli_quality)
+        return gzip.compress(data, compresslevel=gzip_level, mtime=0)
+
+    def compress_response(self, response, config):
+        if (response.mimetype not in config['COMPRESS_MIMETYPES']
+                or response.direct_passthrough or response.is_streamed
+                or 'Content-Encoding' in response.headers):
+            return response
+
+        # The body depends on Accept-Encoding whether or not this one is
+        # compressed, so shared caches must key on it.
+        response.vary.add('Accept-Encoding')
+
+        if (not 200 <= response.status_code < 300 or response.status_code == 204
+                or (response.content_length or 0) < config['COMPRESS_MIN_SIZE']):
+            return response
+
+        encoding = request.accept_encodings.best_match(self.encodings)
+        if encoding is None:
+            return response
+
+        tag, weak = response.get_etag()
+        if getattr(response, 'precompressed', False) and tag and not weak:
+            key = (request.full_path, tag, encoding)
+            body = self._cache.get(key)
+            if body is None:
+                body = self.compress(response.get_data(), encoding, 9, 11)
+                self._cache.set(key, body)
+        else:
+            body = self.compress(response.get_data(), encoding,
+                                 config['COMPRESS_GZIP_LEVEL'],
+                                 config['COMPRESS_BROTLI_QUALITY'])
+
+        response.set_data(body)
+        response.headers['Content-Encoding'] = encoding
+        if tag:
+            response.set_etag(tag, weak=True)
+        return response
+
+
+compressor = Compressor()
@@ -0,0 +1,88 @@
+"""
+Conditional GET support (ETag / If-None-Match) for API resources.
+
+Resources opt in by marking a GET method with ``@etag(source)``, where
+`source` is a callable returning the current version tag of whatever the
+response is built from, or None to skip conditional handling. The tag is
+computed from a cheap change counter rather than the response body, so
+``conditional_get`` (installed as an ``Api`` decorator) can answer
+``304 Not Modified`` before the resource method runs any serialization.
+
+Tags are compared weakly: ``app.compression`` weakens the ETag of
+compressed responses, and those must revalidate too.
+"""
+from functools import wraps
+
+from flask import current_app, request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+
+
+def etag(source):
+    """Mark a resource method as supporting conditional GET via `source`."""
+    def decorator(func):
+        func._etag_source = source
+        return func
+    return decorator
+
+
+def conditional_get(view):
+    """Api-wide decorator answering If-None-Match for marked GET methods."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        source = None
+        if request.method == 'GET':
+            view_class = getattr(view, 'view_class', None)
+            method = getattr(view_class, 'get', None)
+            source = getattr(method, '_etag_source', None)
+
+        tag = source() if source else None
+        if tag is None:
+            return view(*args, **kwargs)
+
+        if request.if_none_match.contains_weak(tag):
+            response = current_app.response_class(status=304)
+            # Echo the form the client holds (weak if it was compressed).
+            response.set_etag(tag, weak=not request.if_none_match.is_strong(tag))
+            return response
+
+        response = view(*args, **kwargs)
+        # no-store marks a body that must not be revalidated later (partial).
+        if response.status_code == 200 and not response.cache_control.no_store:
+            response.set_etag(tag)
+        return response
+
+    return wrapper
+
+
+def catalog_etag():
+    """Tag for responses built from the exercise catalog."""
+    from app.catalog import catalog_cache
+    return f"catalog-{catalog_cache.version()}"
+
+
+def user_etag():
+    """Tag for responses built from rows owned by the authenticated user."""
+    from app import db
+    from app.models import User
+
+    try:
+        verify_jwt_in_request()
+    except Exception:
+        # Let the resource's own @jwt_required() produce the error response.
+        return None
+
+    user_id = int(get_jwt_identity())
+    version = db.session.execute(
+        db.select(User.data_version).where(User.id == user_id)).scalar()
+    if version is None:
+        return None
+    return f"user-{user_id}-{version}"
+
+
+def user_catalog_etag():
+    """
+    Tag for responses built from the user's rows joined to exercise
+    catalog rows (names, descriptions), which change independently.
+    """
+    tag = user_etag()
+    return tag and f"{tag}-{catalog_etag()}"
@@ -0,0 +1,80 @@
+"""
+Database engine configuration read from the environment.
+
+Pool settings apply to server databases and file-backed SQLite:
+
+- ``DB_POOL_SIZE`` connections kept open per process (5)
+- ``DB_MAX_OVERFLOW`` extra connections allowed under load (10)
+- ``DB_POOL_TIMEOUT`` seconds to wait for a free connection (30)
+- ``DB_POOL_RECYCLE`` seconds after which connections are replaced (1800)
+- ``DB_POOL_PRE_PING`` test connections before use, 1/0 (1)
+- ``DB_STATEMENT_TIMEOUT_MS`` per-statement limit on PostgreSQL, 0 = off (0)
+
+SQLite connections get these pragmas on connect (see ``app.models``):
+
+- ``SQLITE_JOURNAL_MODE`` (WAL) lets readers run alongside a writer
+- ``SQLITE_SYNCHRONOUS`` (NORMAL) is crash-safe with WAL and much cheaper
+  than FULL
+- ``SQLITE_BUSY_TIMEOUT_MS`` (5000) waits for a lock instead of failing
+  with "database is locked"
+"""
+import os
+
+
+def _env_int(name, default):
+    return int(os.getenv(name, default))
+
+
+def _env_bool(name, default):
+    return os.getenv(name, str(int(default))).lower() in ('1', 'true', 'yes', 'on')
+
+
+def engine_options(database_uri):
+    """Return SQLALCHEMY_ENGINE_OPTIONS for `database_uri`."""
+    options = {
+        'pool_pre_ping': _env_bool('DB_POOL_PRE_PING', True),
+        'pool_recycle': _env_int('DB_POOL_RECYCLE', 1800),
+    }
+
+    is_sqlite = database_uri.startswith('sqlite')
+    in_memory = is_sqlite and (database_uri in ('sqlite://', 'sqlite:///:memory:')
+                               or 'mode=memory' in database_uri)
+    if not in_memory:
+        options.update(
+            pool_size=_env_int('DB_POOL_SIZE', 5),
+            max_overflow=_env_int('DB_MAX_OVERFLOW', 10),
+            pool_timeout=_env_int('DB_POOL_TIMEOUT', 30),
+        )
+
+    if is_sqlite:
+        # sqlite3's own lock wait, in seconds; the busy_timeout pragma is
+        # set as well so the value survives pool resets.
+        options['connect_args'] = {
+            'timeout': _env_int('SQLITE_BUSY_TIMEOUT_MS', 5000) / 1000,
+        }
+    elif database_uri.startswith('postgresql'):
+        timeout = _env_int('DB_STATEMENT_TIMEOUT_MS', 0)
+        if timeout:
+            options['connect_args'] = {'options': f'-c statement_timeout={timeout}'}
+
+    return options
+
+
+def sqlite_pragmas():
+    """Return the pragmas to run on each new SQLite connection, in order."""
+    return [
+        ('journal_mode', os.getenv('SQLITE_JOURNAL_MODE', 'WAL')),
+        ('synchronous', os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')),
+        ('busy_timeout', _env_int('SQLITE_BUSY_TIMEOUT_MS', 5000)),
+    ]
+
+
+def pool_status(engine):
+    """Current connection pool counters for `engine`."""
+    pool = engine.pool
+    status = {'class': type(pool).__name__}
+    for name in ('size', 'checkedin', 'checkedout', 'overflow'):
+        counter = getattr(pool, name, None)
+        if callable(counter):
+            status[name] = counter()
+    return status
@@ -0,0 +1,155 @@
+"""
+The home screen payload, gathered in one request.
+
+``GET /api/dashboard`` combines the profile, fitness goal, exercise goals,
+plan summaries and the first page of sessions. The sections are
+independent, so they are read concurrently from a thread pool, each
+thread in its own app context and therefore its own session and pooled
+connection.
+
+The response waits at most ``DASHBOARD_BUDGET_MS`` for the sections.
+Sections that are not ready by then are returned as null and listed in
+``incomplete``; the client can fetch them from their own endpoints. Such
+partial responses are sent ``Cache-Control: no-store`` and untagged, so a
+later revalidation cannot pin them.
+
+Configuration (``app.config``):
+
+- ``DASHBOARD_BUDGET_MS``: time to wait for the sections (default 500).
+- ``DASHBOARD_WORKERS``: threads per process reading sections (default
+  4). Every running section holds a database connection, so keep this
+  within ``DB_POOL_SIZE + DB_MAX_OVERFLOW``.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from flask import current_app
+from sqlalchemy import select
+
+from app import db
+from app.models import UserProfile, FitnessGoal, ExerciseGoal, WorkoutPlan, WorkoutSession
+from app.executors import LazyExecutor
+from app.pagination import encode_cursor
+from app.shapes import EXERCISE_GOAL_FIELDS, WORKOUT_PLAN_SUMMARY_FIELDS, WORKOUT_SESSION_FIELDS
+
+
+# Sessions on the dashboard; the rest are paged from /api/workout-sessions.
+SESSION_PAGE_SIZE = 10
+
+# Compact selections of the list endpoints' fields
+EXERCISE_GOAL_SELECTION = EXERCISE_GOAL_FIELDS.parse(
+    'id,exercise.id,exercise.name,target_sets,target_reps,target_duration,target_distance')
+WORKOUT_PLAN_SELECTION = WORKOUT_PLAN_SUMMARY_FIELDS.parse(None)
+WORKOUT_SESSION_SELECTION = WORKOUT_SESSION_FIELDS.parse('id,workout_plan_id,date,duration,notes')
+
+
+def _first(query):
+    row = db.session.execute(query).first()
+    return dict(row._mapping) if row is not None else None
+
+
+def profile(user_id):
+    return _first(select(
+        UserProfile.current_weight, UserProfile.height, UserProfile.age,
+        UserProfile.body_fat_percentage, UserProfile.muscle_mass,
+    ).where(UserProfile.user_id == user_id))
+
+
+def fitness_goal(user_id):
+    return _first(select(
+        FitnessGoal.target_weight, FitnessGoal.target_muscle_mass,
+        FitnessGoal.target_body_fat_percentage,
+    ).where(FitnessGoal.user_id == user_id))
+
+
+def exercise_goals(user_id):
+    query = EXERCISE_GOAL_FIELDS.select(EXERCISE_GOAL_SELECTION).where(
+        ExerciseGoal.user_id == user_id).order_by(ExerciseGoal.id)
+    return EXERCISE_GOAL_FIELDS.to_dicts(db.session.execute(query), EXERCISE_GOAL_SELECTION)
+
+
+def workout_plans(user_id):
+    query = WORKOUT_PLAN_SUMMARY_FIELDS.select(WORKOUT_PLAN_SELECTION).where(
+        WorkoutPlan.user_id == user_id).order_by(WorkoutPlan.id)
+    return WORKOUT_PLAN_SUMMARY_FIELDS.to_dicts(db.session.execute(query), WORKOUT_PLAN_SELECTION)
+
+
+def workout_sessions(user_id):
+    """The newest sessions and the cursor of the page after them."""
+    query = WORKOUT_SESSION_FIELDS.select(
+        WORKOUT_SESSION_SELECTION, WorkoutSession.date, WorkoutSession.id).where(
+        WorkoutSession.user_id == user_id)
+    rows = db.session.execute(query.order_by(
+        WorkoutSession.date.desc(), WorkoutSession.id.desc()).limit(SESSION_PAGE_SIZE + 1)).all()
+    next_cursor = None
+    if len(rows) > SESSION_PAGE_SIZE:
+        rows = rows[:SESSION_PAGE_SIZE]
+        next_cursor = encode_cursor(rows[-1][-2], rows[-1][-1])
+    return {
+        'items': WORKOUT_SESSION_FIELDS.to_dicts(rows, WORKOUT_SESSION_SELECTION),
+        'next_cursor': next_cursor,
+    }
+
+
+SECTIONS = {
+    'profile': profile,
+    'fitness_goal': fitness_goal,
+    'exercise_goals': exercise_goals,
+    'workout_plans': workout_plans,
+    'workout_sessions': workout_sessions,
+}
+
+
+class Dashboard:
+    def __init__(self):
+        self.budget = 0.5
+        self.workers = 4
+        self._pool = LazyExecutor(
+            lambda: ThreadPoolExecutor(self.workers, thread_name_prefix='dashboard'))
+
+    def init_app(self, app):
+        config = app.config
+        config.setdefault('DASHBOARD_BUDGET_MS', int(os.getenv('DASHBOARD_BUDGET_MS', 500)))
+        config.setdefault('DASHBOARD_WORKERS', int(os.getenv('DASHBOARD_WORKERS', 4)))
+
+        self.shutdown()
+        self.budget = config['DASHBOARD_BUDGET_MS'] / 1000
+        self.workers = config['DASHBOARD_WORKERS']
+
+    def shutdown(self):
+        self._pool.discard()
+
+    def build(self, user_id):
+        """
+        Return ``(payload, complete)``: every section by name, plus
+        ``incomplete``, the sections that failed or missed the budget.
+        """
+        app = current_app._get_current_object()
+
+        def run(section):
+            # A context per section: Flask-SQLAlchemy scopes sessions to it.
+            with app.app_context():
+                return section(user_id)
+
+        pool = self._pool.get()
+        futures = {name: pool.submit(run, section) for name, section in SECTIONS.items()}
+        wait(futures.values(), timeout=self.budget)
+
+        payload, incomplete = {}, []
+        for name, future in futures.items():
+            payload[name] = None
+            if not future.done():
+                # Not started yet: drop it. Running ones finish unobserved.
+                future.cancel()
+                incomplete.append(name)
+            elif future.exception() is not None:
+                current_app.logger.error('Dashboard section %s failed', name,
+                                         exc_info=future.exception())
+                incomplete.append(name)
+            else:
+                payload[name] = future.result()
+        payload['incomplete'] = incomplete
+        return payload, not incomplete
+
+
+dashboard = Dashboard()
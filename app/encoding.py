@@ -0,0 +1,88 @@
+"""
+JSON encoding for API responses.
+
+``response_encoder`` is installed as the Api's ``application/json``
+representation and used for cached catalog bodies. It encodes with
+orjson when that is installed and falls back to the stdlib ``json``
+module otherwise; both write compact UTF-8 and format dates and
+datetimes like ``isoformat()``, so handlers can return them as-is.
+
+Configuration (``app.config``):
+
+- ``JSON_ENCODER``: ``auto`` (default), ``orjson`` or ``json``.
+
+Large lists should be read as column rows rather than ORM objects and
+turned into dicts with ``rows_to_dicts``; that skips building and
+tracking a model instance and calling ``to_dict()`` for every row.
+"""
+import json
+import os
+from datetime import date, datetime, time
+from decimal import Decimal
+
+from flask import current_app
+
+try:
+    import orjson
+except ImportError:  # optional, see requirements.txt
+    orjson = None
+
+
+def _default(obj):
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+
+def _stdlib_dumps(obj):
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False,
+                      default=_default).encode('utf-8')
+
+
+def _orjson_dumps(obj):
+    return orjson.dumps(obj, default=_default)
+
+
+class ResponseEncoder:
+    def __init__(self):
+        self.name = None
+        self.dumps = None
+        self.configure('auto')
+
+    def init_app(self, app):
+        app.config.setdefault('JSON_ENCODER', os.getenv('JSON_ENCODER', 'auto'))
+        self.configure(app.config['JSON_ENCODER'])
+
+    def configure(self, name):
+        if name == 'auto':
+            name = 'orjson' if orjson is not None else 'json'
+        if name == 'orjson':
+            if orjson is None:
+                raise ValueError("JSON_ENCODER is 'orjson' but orjson is not installed")
+            self.dumps = _orjson_dumps
+        elif name == 'json':
+            self.dumps = _stdlib_dumps
+        else:
+            raise ValueError(f"Unknown JSON_ENCODER {name!r}; use auto, orjson or json")
+        self.name = name
+
+    def output_json(self, data, code, headers=None):
+        """flask-restx representation for ``application/json``."""
+        response = current_app.response_class(self.dumps(data), status=code,
+                                              mimetype='application/json')
+        response.headers.extend(headers or {})
+        return response
+
+
+response_encoder = ResponseEncoder()
+
+
+def rows_to_dicts(result):
+    """
+    Turn a Core result into a list of dicts keyed by column label, for
+    selects whose labels match the model's ``to_dict()`` keys.
+    """
+    keys = list(result.keys())
+    return [dict(zip(keys, row)) for row in result]
@@ -0,0 +1,37 @@
+"""
+Executors shared by the request threads of a process.
+
+``LazyExecutor`` creates its executor on first use rather than at app
+creation, so pre-forking servers (see ``app.serving``) get one pool per
+worker process instead of inheriting an unusable copy of the master's.
+"""
+import threading
+
+
+class LazyExecutor:
+    """Holds the executor returned by `factory`, created on first ``get()``."""
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = self._factory()
+            return self._executor
+
+    def discard(self, executor=None):
+        """
+        Shut down the current executor so the next ``get()`` makes a new
+        one. If `executor` is given, only discard it if it is still current
+        (another thread may already have replaced a broken pool).
+        """
+        with self._lock:
+            if executor is None:
+                executor = self._executor
+            if executor is None or executor is not self._executor:
+                return
+            self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
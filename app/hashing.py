@@ -0,0 +1,119 @@
+"""
+Password hashing off the request thread.
+
+Hashes are computed in a small process pool so a burst of logins cannot
+pin every request worker. The number of in-flight hashes is bounded; when
+the pool is saturated ``HashingBusy`` is raised and the API answers 429
+instead of queueing requests indefinitely. If a hash times out or a pool
+process dies, ``HashingUnavailable`` is raised (503); a broken pool is
+replaced on the next hash.
+
+Configuration (``app.config``):
+
+- ``PASSWORD_HASH_METHOD``: werkzeug method string, e.g. ``scrypt``,
+  ``scrypt:16384:8:1`` or ``pbkdf2:sha256:600000`` (default ``scrypt``).
+- ``PASSWORD_HASH_WORKERS``: pool size; 0 hashes inline (default half
+  the CPUs).
+- ``PASSWORD_HASH_QUEUE_DEPTH``: max hashes running or queued at once
+  (default four per worker).
+- ``PASSWORD_HASH_TIMEOUT``: seconds to wait for a result (default 10).
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+from app.executors import LazyExecutor
+
+
+class HashingBusy(Exception):
+    """Raised when too many password hashes are already in flight."""
+
+
+class HashingUnavailable(Exception):
+    """Raised when a hash timed out or its pool process died."""
+
+
+class PasswordHasher:
+    def __init__(self):
+        self.method = 'scrypt'
+        self.workers = 0
+        self.timeout = 10
+        self._slots = threading.BoundedSemaphore(1)
+        self._pool = LazyExecutor(self._create_pool)
+        self._prefix = None
+
+    def init_app(self, app):
+        config = app.config
+        config.setdefault('PASSWORD_HASH_METHOD', os.getenv('PASSWORD_HASH_METHOD', 'scrypt'))
+        config.setdefault('PASSWORD_HASH_WORKERS', int(os.getenv(
+            'PASSWORD_HASH_WORKERS', max(1, (os.cpu_count() or 1) // 2))))
+        config.setdefault('PASSWORD_HASH_QUEUE_DEPTH', int(os.getenv(
+            'PASSWORD_HASH_QUEUE_DEPTH', 4 * max(1, config['PASSWORD_HASH_WORKERS']))))
+        config.setdefault('PASSWORD_HASH_TIMEOUT', float(os.getenv('PASSWORD_HASH_TIMEOUT', 10)))
+
+        self.shutdown()
+        self.method = config['PASSWORD_HASH_METHOD']
+        self.workers = config['PASSWORD_HASH_WORKERS']
+        self.timeout = config['PASSWORD_HASH_TIMEOUT']
+        self._slots = threading.BoundedSemaphore(config['PASSWORD_HASH_QUEUE_DEPTH'])
+        self._prefix = None
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, pwhash, password):
+        return self._run(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        """True if `pwhash` was made with different parameters than configured."""
+        if self._prefix is None:
+            # werkzeug expands defaults ("scrypt" -> "scrypt:32768:8:1"), so
+            # read the canonical prefix off a real hash once.
+            self._prefix = generate_password_hash('', self.method).split('$', 1)[0]
+        return pwhash.split('$', 1)[0] != self._prefix
+
+    def shutdown(self):
+        self._pool.discard()
+
+    def _run(self, func, *args):
+        if self.workers <= 0:
+            return func(*args)
+
+        if not self._slots.acquire(blocking=False):
+            raise HashingBusy()
+        try:
+            # Inside the try: creating the pool can fail too (e.g. fork errors).
+            pool = self._pool.get()
+            future = pool.submit(func, *args)
+        except BrokenProcessPool:
+            self._slots.release()
+            # A pool process died; the next hash starts a new pool.
+            self._pool.discard(pool)
+            raise HashingUnavailable()
+        except BaseException:
+            self._slots.release()
+            raise
+        # Hold the slot until the hash actually finishes, even if we time out.
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except BrokenProcessPool:
+            self._pool.discard(pool)
+            raise HashingUnavailable()
+        except TimeoutError:
+            raise HashingUnavailable()
+
+    def _create_pool(self):
+        # Forking a threaded server process is unsafe, so children come
+        # from a clean forkserver where the platform has one.
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context(
+            'forkserver' if 'forkserver' in methods else 'spawn')
+        return ProcessPoolExecutor(self.workers, mp_context=context)
+
+
+password_hasher = PasswordHasher()
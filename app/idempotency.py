@@ -0,0 +1,170 @@
+"""
+``Idempotency-Key`` support for create endpoints.
+
+A client retrying a POST after a dropped connection sends the same
+``Idempotency-Key`` header as the first attempt. The first request with a
+key claims it by inserting a row into ``idempotency_keys`` (unique per
+user and key) and runs; its status and body are then stored in that row
+for ``IDEMPOTENCY_TTL`` seconds. Later requests with the key get the
+stored response back, with an ``Idempotent-Replayed: true`` header,
+instead of inserting again. A duplicate arriving while the first is still
+running polls the row until the result is stored. Reusing a key for a
+different request (method, path or body) answers 422.
+
+The table is shared by every worker process, and claims and results are
+committed on their own connection right away, so duplicates are collapsed
+whichever worker they reach.
+
+Results are only stored for responses below 500; if the first request
+raises or fails with a server error, its claim is released and the next
+attempt runs again. A claim left behind by a worker that died expires
+after ``IN_FLIGHT_TIMEOUT`` seconds. ``flask idempotency prune`` deletes
+expired rows.
+
+Configuration (``app.config``):
+
+- ``IDEMPOTENCY_TTL``: seconds a result is replayed for (default 86400).
+"""
+import hashlib
+import os
+import time
+from datetime import datetime, timedelta
+from functools import wraps
+
+import click
+from flask import current_app, request
+from flask.cli import AppGroup
+from flask_jwt_extended import get_jwt_identity
+from flask_restx.utils import unpack
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.encoding import response_encoder
+from app.models import IdempotencyKey
+
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+# Seconds a duplicate waits for the request holding its key, and how long
+# a claim lasts without a result before another request may take it.
+IN_FLIGHT_TIMEOUT = 30
+
+# Polling interval bounds while waiting for a claimed key, in seconds
+POLL_MIN = 0.01
+POLL_MAX = 0.25
+
+
+def _fingerprint():
+    digest = hashlib.sha256(f'{request.method} {request.path}\n'.encode('utf-8'))
+    digest.update(request.get_data())
+    return digest.hexdigest()
+
+
+def _same_key(table, user_id, key):
+    return (table.c.user_id == user_id) & (table.c.key == key)
+
+
+def _claim(user_id, key, fingerprint):
+    """Claim `key`; return None on success, or the row already holding it."""
+    table = IdempotencyKey.__table__
+    now = datetime.utcnow()
+    try:
+        with db.engine.begin() as connection:
+            connection.execute(delete(table).where(
+                _same_key(table, user_id, key), table.c.expires_at < now))
+            connection.execute(insert(table).values(
+                user_id=user_id, key=key, fingerprint=fingerprint,
+                expires_at=now + timedelta(seconds=IN_FLIGHT_TIMEOUT)))
+        return None
+    except IntegrityError:
+        with db.engine.connect() as connection:
+            return connection.execute(
+                select(table.c.fingerprint, table.c.status_code, table.c.response)
+                .where(_same_key(table, user_id, key))).first()
+
+
+def _finish(user_id, key, result):
+    """Store `result` for the claimed key, or release the claim if it is None."""
+    table = IdempotencyKey.__table__
+    with db.engine.begin() as connection:
+        if result is None:
+            connection.execute(delete(table).where(
+                _same_key(table, user_id, key), table.c.status_code.is_(None)))
+        else:
+            data, code, _ = result
+            connection.execute(update(table).where(_same_key(table, user_id, key)).values(
+                status_code=code, response=response_encoder.dumps(data),
+                expires_at=datetime.utcnow() + timedelta(
+                    seconds=current_app.config['IDEMPOTENCY_TTL'])))
+
+
+def _replay(row):
+    response = current_app.response_class(
+        row.response, status=row.status_code, mimetype='application/json')
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def run(user_id, key, func, *args, **kwargs):
+    """Call `func` once per user and `key`; replay its result for repeated keys."""
+    fingerprint = _fingerprint()
+    deadline = time.monotonic() + IN_FLIGHT_TIMEOUT
+    delay = POLL_MIN
+    while True:
+        row = _claim(user_id, key, fingerprint)
+        if row is None:
+            break
+        if row.fingerprint != fingerprint:
+            return {"message": f"{HEADER} was already used for a different request"}, 422
+        if row.status_code is not None:
+            return _replay(row)
+        if time.monotonic() >= deadline:
+            return {"message": f"A request with this {HEADER} is still in progress"}, 409
+        time.sleep(delay)
+        delay = min(delay * 2, POLL_MAX)
+
+    result = None
+    try:
+        result = unpack(func(*args, **kwargs))
+    finally:
+        # Anything the handler left uncommitted is discarded at teardown
+        # anyway; end it now so it cannot hold locks against _finish.
+        db.session.rollback()
+        _finish(user_id, key, result if result and result[1] < 500 else None)
+    return result
+
+
+def idempotent(func):
+    """
+    Collapse repeated requests carrying the same ``Idempotency-Key``.
+
+    Goes below ``@jwt_required()``: keys are scoped to the user.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(HEADER)
+        if key is None:
+            return func(*args, **kwargs)
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return {"message": f"{HEADER} must be 1 to {MAX_KEY_LENGTH} characters"}, 400
+        return run(int(get_jwt_identity()), key, func, *args, **kwargs)
+    return wrapper
+
+
+idempotency_command = AppGroup('idempotency', help='Maintain stored Idempotency-Key results.')
+
+
+@idempotency_command.command('prune')
+def prune_command():
+    """Delete expired Idempotency-Key rows."""
+    result = db.session.execute(db.delete(IdempotencyKey).where(
+        IdempotencyKey.expires_at < datetime.utcnow()))
+    db.session.commit()
+    click.echo(f'Deleted {result.rowcount} idempotency keys.')
+
+
+def init_idempotency(app):
+    app.config.setdefault('IDEMPOTENCY_TTL', int(os.getenv('IDEMPOTENCY_TTL', 86400)))
+    app.cli.add_command(idempotency_command)
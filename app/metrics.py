@@ -0,0 +1,192 @@
+"""
+Per-request instrumentation and a Prometheus-style ``/metrics`` endpoint.
+
+For every request we record, labelled by route and method:
+
+- total latency,
+- number of SQL statements and time spent executing them,
+- time spent encoding the response body.
+
+SQL timing comes from ``before_cursor_execute``/``after_cursor_execute``
+(or ``handle_error`` for failed statements) events on every Engine;
+request timing from Flask request hooks. Requests slower than
+``SLOW_REQUEST_MS`` are logged together with their statements. Histograms are kept per process, so with several workers each
+one reports its own series.
+"""
+import os
+import threading
+import time
+from bisect import bisect_left
+from functools import wraps
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# Statements kept per request for the slow request log
+MAX_LOGGED_STATEMENTS = 50
+
+
+class Histogram:
+    def __init__(self, name, help, buckets):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observe(self, labels, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = {labels: list(values) for labels, values in self._series.items()}
+        for (endpoint, method), values in sorted(series.items()):
+            label = f'endpoint="{endpoint}",method="{method}"'
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{label},le="{bound}"}} {cumulative}')
+            cumulative += values[len(self.buckets)]
+            lines.append(f'{self.name}_bucket{{{label},le="+Inf"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{label}}} {values[-1]:.6f}')
+            lines.append(f'{self.name}_count{{{label}}} {cumulative}')
+        return lines
+
+
+request_duration = Histogram(
+    'http_request_duration_seconds', 'Total request latency.', SECONDS_BUCKETS)
+db_duration = Histogram(
+    'http_request_db_seconds', 'Time spent executing SQL per request.', SECONDS_BUCKETS)
+db_queries = Histogram(
+    'http_request_db_queries', 'SQL statements executed per request.', COUNT_BUCKETS)
+serialization_duration = Histogram(
+    'http_request_serialization_seconds', 'Time spent encoding the response body.',
+    SECONDS_BUCKETS)
+
+HISTOGRAMS = (request_duration, db_duration, db_queries, serialization_duration)
+
+
+def current_stats():
+    """The stats dict for the current request, or None outside a request."""
+    if has_request_context():
+        return g.get('_request_stats')
+    return None
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('_query_start', []).append(time.perf_counter())
+
+
+def _record_statement(conn, statement):
+    elapsed = time.perf_counter() - conn.info['_query_start'].pop()
+    stats = current_stats()
+    if stats is not None:
+        stats['queries'] += 1
+        stats['db_time'] += elapsed
+        if len(stats['statements']) < MAX_LOGGED_STATEMENTS:
+            stats['statements'].append((elapsed, statement))
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    _record_statement(conn, statement)
+
+
+@event.listens_for(Engine, 'handle_error')
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute; pop its start
+    # time here so the pooled connection's stack stays balanced. The stack
+    # is empty if the error came before the cursor ran or while fetching.
+    conn = exception_context.connection
+    if conn is not None and conn.info.get('_query_start'):
+        _record_statement(conn, exception_context.statement)
+
+
+def timed_encoder(encode):
+    """
+    Wrap a function that encodes a response body (a flask-restx
+    representation or a cache serializer) to record its run time.
+    """
+    @wraps(encode)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        result = encode(*args, **kwargs)
+        stats = current_stats()
+        if stats is not None:
+            stats['serialization_time'] += time.perf_counter() - start
+        return result
+    return wrapper
+
+
+def render_metrics(engines=()):
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+
+    from app.config import pool_status
+    lines.append('# HELP db_pool_connections Connection pool counters.')
+    lines.append('# TYPE db_pool_connections gauge')
+    for engine in engines:
+        for key, value in pool_status(engine).items():
+            if key != 'class':
+                lines.append(f'db_pool_connections{{state="{key}"}} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+def init_metrics(app):
+    """Install the request hooks and the /metrics endpoint on `app`."""
+    app.config.setdefault('SLOW_REQUEST_MS', int(os.getenv('SLOW_REQUEST_MS', 500)))
+
+    @app.before_request
+    def _start_request_stats():
+        g._request_stats = {
+            'start': time.perf_counter(),
+            'queries': 0,
+            'db_time': 0.0,
+            'serialization_time': 0.0,
+            'statements': [],
+        }
+
+    @app.after_request
+    def _record_request_stats(response):
+        stats = g.pop('_request_stats', None)
+        if stats is None:
+            return response
+
+        total = time.perf_counter() - stats['start']
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        labels = (endpoint, request.method)
+        request_duration.observe(labels, total)
+        db_duration.observe(labels, stats['db_time'])
+        db_queries.observe(labels, stats['queries'])
+        serialization_duration.observe(labels, stats['serialization_time'])
+
+        if total * 1000 >= app.config['SLOW_REQUEST_MS']:
+            statements = '\n'.join(f'  {elapsed * 1000:.1f} ms  {statement}'
+                                   for elapsed, statement in stats['statements'])
+            app.logger.warning(
+                'Slow request %s %s: %.1f ms total, %d queries in %.1f ms, '
+                'serialization %.1f ms\n%s',
+                request.method, request.full_path.rstrip('?'), total * 1000,
+                stats['queries'], stats['db_time'] * 1000,
+                stats['serialization_time'] * 1000, statements)
+        return response
+
+    @app.route('/metrics')
+    def metrics():
+        from app import db
+        return app.response_class(render_metrics([db.engine]),
+                                  mimetype='text/plain; version=0.0.4')
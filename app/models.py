@@ -1,10 +1,32 @@
-from flask import jsonify
+import sqlite3
+from flask import current_app, has_app_context, jsonify
 from app import db
-from werkzeug.security import generate_password_hash, check_password_hash
+from app.cache import TTLCache
+from app.config import sqlite_pragmas
+from app.hashing import password_hasher
 from flask_jwt_extended import get_jwt_identity
 from datetime import datetime
-from sqlalchemy import event
+from sqlalchemy import event, inspect
 from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+
+# Ids of users recently confirmed to exist, see User.get_current_user().
+_known_users = TTLCache(maxsize=10000)
+
+
+@event.listens_for(Engine, 'connect')
+def _configure_sqlite_connection(dbapi_connection, connection_record):
+    """Apply SQLITE_PRAGMAS (WAL, synchronous, busy_timeout) to new connections."""
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    pragmas = (current_app.config['SQLITE_PRAGMAS']
+               if has_app_context() and 'SQLITE_PRAGMAS' in current_app.config
+               else sqlite_pragmas())
+    cursor = dbapi_connection.cursor()
+    for name, value in pragmas:
+        cursor.execute(f'PRAGMA {name}={value}')
+    cursor.close()
 
 
 class User(db.Model):
@@ -13,17 +35,53 @@ class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(50), unique=True, nullable=False)
     password = db.Column(db.String(90), nullable=False)
+    # Bumped whenever any row owned by the user changes; used for ETags.
+    data_version = db.Column(db.Integer, nullable=False,
+                             default=0, server_default='0')
 
     def set_password(self, password):
-        self.password = generate_password_hash(password)
+        self.password = password_hasher.hash(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password, password)
+        return password_hasher.verify(self.password, password)
+
+    def password_needs_rehash(self):
+        return password_hasher.needs_rehash(self.password)
 
     @staticmethod
     def get_current_user():
-        current_user_id = get_jwt_identity()
-        return User.query.get(int(current_user_id))
+        """
+        Return the authenticated user.
+
+        Ids confirmed to exist within the last USER_CACHE_TTL seconds are
+        attached to the session as unloaded instances without a SELECT;
+        their columns and relationships load lazily on first access.
+        """
+        current_user_id = int(get_jwt_identity())
+        if current_user_id in _known_users:
+            user = User(id=current_user_id)
+            make_transient_to_detached(user)
+            return db.session.merge(user, load=False)
+
+        user = db.session.get(User, current_user_id)
+        if user:
+            _known_users.set(current_user_id, True,
+                             current_app.config.get('USER_CACHE_TTL', 60))
+        return user
+
+    @staticmethod
+    def bump_data_version(connection, user_ids):
+        """Increment `data_version` for the given users on `connection`."""
+        if user_ids:
+            connection.execute(
+                db.update(User.__table__)
+                .where(User.__table__.c.id.in_(user_ids))
+                .values(data_version=User.__table__.c.data_version + 1))
+
+
+@event.listens_for(User, 'after_delete')
+def _forget_deleted_user(mapper, connection, target):
+    _known_users.pop(target.id)
 
 
 class UserProfile(db.Model):
@@ -45,18 +103,18 @@ class UserProfile(db.Model):
         return {
             'user_id': self.user_id,
             'current_weight': self.current_weight,
-            'target_weight': self.target_weight,
             'height': self.height,
             'age': self.age,
             'body_fat_percentage': self.body_fat_percentage,
-            'muscle_mass': self.muscle_mass,
-            'created_at': self.created_at.isoformat(),
-            'updated_at': self.updated_at.isoformat()
+            'muscle_mass': self.muscle_mass
         }
 
 
 class FitnessGoal(db.Model):
     __tablename__ = 'fitness_goals'
+    __table_args__ = (
+        db.Index('ix_fitness_goals_user_id_updated_at', 'user_id', 'updated_at'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey(
@@ -64,6 +122,9 @@ class FitnessGoal(db.Model):
     target_weight = db.Column(db.Float)
     target_muscle_mass = db.Column(db.Float)
     target_body_fat_percentage = db.Column(db.Float)
+    # Set on insert and every update; read by /api/sync.
+    updated_at = db.Column(db.DateTime, nullable=False,
+                           default=datetime.utcnow, onupdate=datetime.utcnow)
 
     user = db.relationship('User', backref=db.backref(
         'fitness_goal', uselist=False, cascade='all, delete-orphan'))
@@ -78,6 +139,22 @@ class FitnessGoal(db.Model):
         }
 
 
+exercise_muscles = db.Table(
+    'exercise_muscles',
+    db.Column('exercise_id', db.Integer, db.ForeignKey(
+        'exercises.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('muscle_id', db.Integer, db.ForeignKey(
+        'muscles.id', ondelete='CASCADE'), primary_key=True, index=True),
+)
+
+
+class Muscle(db.Model):
+    __tablename__ = 'muscles'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False, unique=True)
+
+
 class Exercises(db.Model):
     __tablename__ = 'exercises'
 
@@ -85,9 +162,14 @@ class Exercises(db.Model):
     name = db.Column(db.String(255), nullable=False, unique=True)
     description = db.Column(db.Text)
     instructions = db.Column(db.Text)
+    # Comma-separated, e.g. "Chest, Shoulders". The normalized copy in
+    # `muscles` is kept in sync on flush, see link_muscles().
     target_muscles = db.Column(db.String(255))
     difficulty = db.Column(db.Integer)
 
+    muscles = db.relationship('Muscle', secondary=exercise_muscles,
+                              viewonly=True, backref='exercises')
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -99,8 +181,73 @@ class Exercises(db.Model):
         }
 
 
+def split_muscles(target_muscles):
+    """Split a "Chest, Shoulders" string into stripped muscle names."""
+    if not target_muscles:
+        return []
+    return [m.strip() for m in target_muscles.split(',') if m.strip()]
+
+
+def link_muscles(connection, exercises):
+    """
+    Create `muscles` rows and `exercise_muscles` links for an iterable of
+    ``(exercise_id, target_muscles)`` pairs, using set-based statements.
+    Muscle names are matched case-insensitively.
+    """
+    links = set()
+    names = {}
+    for exercise_id, target_muscles in exercises:
+        for muscle in split_muscles(target_muscles):
+            names.setdefault(muscle.lower(), muscle)
+            links.add((exercise_id, muscle.lower()))
+    if not links:
+        return
+
+    def lookup():
+        return {name.lower(): id for id, name in connection.execute(
+            db.select(Muscle.id, Muscle.name)
+            .where(db.func.lower(Muscle.name).in_(names)))}
+
+    muscle_ids = lookup()
+    missing = [{'name': names[key]} for key in names if key not in muscle_ids]
+    if missing:
+        connection.execute(db.insert(Muscle.__table__), missing)
+        muscle_ids = lookup()
+
+    connection.execute(db.insert(exercise_muscles), [
+        {'exercise_id': exercise_id, 'muscle_id': muscle_ids[key]}
+        for exercise_id, key in links])
+
+
+@event.listens_for(Session, 'after_flush')
+def _sync_exercise_muscles(session, flush_context):
+    """Keep exercise_muscles in step with Exercises.target_muscles."""
+    relink = [obj for obj in session.new if isinstance(obj, Exercises)]
+    stale_ids = [obj.id for obj in session.deleted if isinstance(obj, Exercises)]
+    for obj in session.dirty:
+        if isinstance(obj, Exercises) and inspect(obj).attrs.target_muscles.history.has_changes():
+            relink.append(obj)
+            stale_ids.append(obj.id)
+
+    connection = session.connection()
+    if stale_ids:
+        connection.execute(db.delete(exercise_muscles)
+                           .where(exercise_muscles.c.exercise_id.in_(stale_ids)))
+    link_muscles(connection, [(obj.id, obj.target_muscles) for obj in relink])
+
+
+class CatalogVersion(db.Model):
+    __tablename__ = 'catalog_version'
+
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+
 class ExerciseGoal(db.Model):
     __tablename__ = 'exercise_goals'
+    __table_args__ = (
+        db.Index('ix_exercise_goals_user_id_updated_at', 'user_id', 'updated_at'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     exercise_id = db.Column(db.Integer, db.ForeignKey(
@@ -111,6 +258,8 @@ class ExerciseGoal(db.Model):
     target_reps = db.Column(db.Integer, nullable=False)
     target_duration = db.Column(db.String(50))
     target_distance = db.Column(db.String(50))
+    updated_at = db.Column(db.DateTime, nullable=False,
+                           default=datetime.utcnow, onupdate=datetime.utcnow)
 
     exercises = db.relationship('Exercises', backref=db.backref(
         'exercise_goals', cascade='all, delete-orphan'))
@@ -128,6 +277,9 @@ class ExerciseGoal(db.Model):
 
 class WorkoutPlan(db.Model):
     __tablename__ = 'workout_plans'
+    __table_args__ = (
+        db.Index('ix_workout_plans_user_id_updated_at', 'user_id', 'updated_at'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey(
@@ -135,6 +287,8 @@ class WorkoutPlan(db.Model):
     name = db.Column(db.String(255), nullable=False)
     frequency = db.Column(db.String(50))
     session_duration = db.Column(db.Integer)
+    updated_at = db.Column(db.DateTime, nullable=False,
+                           default=datetime.utcnow, onupdate=datetime.utcnow)
 
     user = db.relationship('User', backref=db.backref(
         'workout_plans', cascade='all, delete-orphan'))
@@ -162,6 +316,10 @@ class WorkoutPlan(db.Model):
 
 class SelectedExercise(db.Model):
     __tablename__ = 'selected_exercises'
+    __table_args__ = (
+        db.Index('ix_selected_exercises_workout_plan_id_updated_at',
+                 'workout_plan_id', 'updated_at'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     workout_plan_id = db.Column(db.Integer, db.ForeignKey(
@@ -172,6 +330,8 @@ class SelectedExercise(db.Model):
     reps = db.Column(db.Integer)
     duration = db.Column(db.String(100))
     distance = db.Column(db.String(100))
+    updated_at = db.Column(db.DateTime, nullable=False,
+                           default=datetime.utcnow, onupdate=datetime.utcnow)
 
     exercise = db.relationship('Exercises', backref=db.backref(
         'selections', cascade='all, delete-orphan'))
@@ -189,6 +349,10 @@ class SelectedExercise(db.Model):
 
 class WorkoutSession(db.Model):
     __tablename__ = 'workout_sessions'
+    __table_args__ = (
+        db.Index('ix_workout_sessions_user_id_date', 'user_id', 'date'),
+        db.Index('ix_workout_sessions_user_id_updated_at', 'user_id', 'updated_at'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     workout_plan_id = db.Column(db.Integer, db.ForeignKey(
@@ -198,6 +362,8 @@ class WorkoutSession(db.Model):
     date = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     duration = db.Column(db.Integer, nullable=False)
     notes = db.Column(db.Text)
+    updated_at = db.Column(db.DateTime, nullable=False,
+                           default=datetime.utcnow, onupdate=datetime.utcnow)
 
     user = db.relationship('User', backref=db.backref(
         'sessions', cascade='all, delete-orphan'))
@@ -213,4 +379,129 @@ class WorkoutSession(db.Model):
             'date': self.date.isoformat(),
             'duration': self.duration,
             'notes': self.notes,
-        }
\ No newline at end of file
+        }
+
+
+class SessionSet(db.Model):
+    """One set performed during a workout session."""
+    __tablename__ = 'session_sets'
+
+    id = db.Column(db.Integer, primary_key=True)
+    workout_session_id = db.Column(db.Integer, db.ForeignKey(
+        'workout_sessions.id', ondelete='CASCADE'), nullable=False, index=True)
+    exercise_id = db.Column(db.Integer, db.ForeignKey(
+        'exercises.id', ondelete='CASCADE'), nullable=False, index=True)
+    # The plan entry the set was performed for, if any.
+    selected_exercise_id = db.Column(db.Integer, db.ForeignKey(
+        'selected_exercises.id', ondelete='SET NULL'), index=True)
+    # 1-based position of the set among the session's sets of the exercise.
+    set_index = db.Column(db.Integer, nullable=False)
+    reps = db.Column(db.Integer)
+    weight = db.Column(db.Float)
+    # Seconds, for timed sets.
+    duration = db.Column(db.Integer)
+
+    workout_session = db.relationship('WorkoutSession', backref=db.backref(
+        'sets', cascade='all, delete-orphan'))
+    exercise = db.relationship('Exercises', backref=db.backref(
+        'session_sets', cascade='all, delete-orphan'))
+    selected_exercise = db.relationship('SelectedExercise', backref='session_sets')
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'exercise_id': self.exercise_id,
+            'selected_exercise_id': self.selected_exercise_id,
+            'set_index': self.set_index,
+            'reps': self.reps,
+            'weight': self.weight,
+            'duration': self.duration,
+        }
+
+
+class UserTrainingStats(db.Model):
+    """
+    Lifetime session totals per user, maintained incrementally on flush
+    (see ``app.training_stats``). Users without sessions have no row.
+    """
+    __tablename__ = 'user_training_stats'
+
+    user_id = db.Column(db.Integer, db.ForeignKey(
+        'users.id', ondelete='CASCADE'), primary_key=True)
+    sessions = db.Column(db.Integer, nullable=False, default=0)
+    total_duration = db.Column(db.Integer, nullable=False, default=0)
+    last_session = db.Column(db.DateTime)
+    # Consecutive training days ending on the day of last_session.
+    streak = db.Column(db.Integer, nullable=False, default=0)
+
+
+class PlanTrainingStats(db.Model):
+    """Session totals per workout plan, maintained with UserTrainingStats."""
+    __tablename__ = 'plan_training_stats'
+
+    workout_plan_id = db.Column(db.Integer, db.ForeignKey(
+        'workout_plans.id', ondelete='CASCADE'), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey(
+        'users.id', ondelete='CASCADE'), nullable=False, index=True)
+    sessions = db.Column(db.Integer, nullable=False, default=0)
+    total_duration = db.Column(db.Integer, nullable=False, default=0)
+
+
+class SyncTombstone(db.Model):
+    """A deleted row of a synced table, reported by /api/sync (see ``app.sync``)."""
+    __tablename__ = 'sync_tombstones'
+    __table_args__ = (
+        db.Index('ix_sync_tombstones_user_id_deleted_at', 'user_id', 'deleted_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey(
+        'users.id', ondelete='CASCADE'), nullable=False)
+    table_name = db.Column(db.String(50), nullable=False)
+    row_id = db.Column(db.Integer, nullable=False)
+    deleted_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+
+class IdempotencyKey(db.Model):
+    """
+    The stored result of a request sent with an ``Idempotency-Key`` header
+    (see ``app.idempotency``). ``status_code`` is null while the first
+    request is still running.
+    """
+    __tablename__ = 'idempotency_keys'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'key', name='uq_idempotency_keys_user_id_key'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey(
+        'users.id', ondelete='CASCADE'), nullable=False)
+    key = db.Column(db.String(255), nullable=False)
+    # sha256 of method, path and body
+    fingerprint = db.Column(db.String(64), nullable=False)
+    status_code = db.Column(db.Integer)
+    response = db.Column(db.LargeBinary)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+
+@event.listens_for(Session, 'after_flush')
+def _bump_user_data_versions(session, flush_context):
+    """Bump the owning user's data_version for every user-scoped row written."""
+    user_ids = set()
+    plan_ids = set()
+    modified = [obj for obj in session.dirty if session.is_modified(obj)]
+    for obj in list(session.new) + modified + list(session.deleted):
+        state = inspect(obj).dict
+        if isinstance(obj, SelectedExercise):
+            plan_ids.add(state.get('workout_plan_id'))
+        elif isinstance(obj, (UserProfile, FitnessGoal, ExerciseGoal, WorkoutPlan, WorkoutSession)):
+            user_ids.add(state.get('user_id'))
+
+    plan_ids.discard(None)
+    if plan_ids:
+        user_ids.update(session.connection().execute(
+            db.select(WorkoutPlan.user_id).where(WorkoutPlan.id.in_(plan_ids))
+        ).scalars())
+
+    user_ids.discard(None)
+    User.bump_data_version(session.connection(), user_ids)
@@ -0,0 +1,34 @@
+"""
+Keyset (cursor) pagination helpers.
+
+Cursors are opaque to clients: the sort key of the last row on a page,
+JSON-encoded and base64url-wrapped. Fetching the next page is then a range
+scan starting after that key, so deep pages cost the same as the first.
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(date, id):
+    raw = json.dumps([date.isoformat(), id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return the ``(date, id)`` key encoded in `cursor`."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        date, id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return datetime.fromisoformat(date), int(id)
+    except (binascii.Error, UnicodeError, ValueError, TypeError):
+        raise InvalidCursor('Invalid cursor')
@@ -0,0 +1,157 @@
+"""
+Sparse fieldsets (``?fields=``) for list endpoints.
+
+A ``Projection`` names the fields an endpoint can return, each backed by
+a column or by a ``Nested`` projection reached through a foreign key.
+Requested fields are turned into a single SELECT of just those columns
+(plus a JOIN per nested object asked for), and rows are assembled into
+dicts without loading ORM objects::
+
+    selection = EXERCISE_GOAL_FIELDS.parse('id,target_sets,exercise.name')
+    query = EXERCISE_GOAL_FIELDS.select(selection).where(...)
+    goals = EXERCISE_GOAL_FIELDS.to_dicts(db.session.execute(query), selection)
+
+Without ``fields`` an endpoint returns its default fields, which match
+the model's ``to_dict()``. Nested objects are only returned when named,
+either whole (``exercise``) or in part (``exercise.name``). Fields are
+always returned in the projection's order, so equivalent requests yield
+equal selections.
+"""
+from sqlalchemy import select
+
+
+class InvalidFields(ValueError):
+    """Raised for a ``fields`` value naming unknown fields."""
+
+
+class Nested:
+    """A related object exposed as field `name`, joined via `foreign_key`."""
+
+    def __init__(self, name, projection, foreign_key):
+        self.name = name
+        self.projection = projection
+        self.foreign_key = foreign_key
+
+
+class Projection:
+    def __init__(self, fields, extra=()):
+        """
+        `fields` are the default fields in output order; `extra` are
+        returned only when requested.
+        """
+        self.fields = {}
+        for field in (*fields, *extra):
+            self.fields[field.name if isinstance(field, Nested) else field.key] = field
+        self.default = tuple(field.name if isinstance(field, Nested) else field.key
+                             for field in fields)
+        first = next(f for f in self.fields.values() if not isinstance(f, Nested))
+        self.model = first.class_
+
+    def parse(self, value):
+        """
+        Turn a comma-separated ``fields`` value into a selection: a tuple
+        of ``(name, None)`` for columns and ``(name, selection)`` for
+        nested objects. An empty value selects the default fields.
+        """
+        names = [name.strip() for name in (value or '').split(',') if name.strip()]
+        return self._selection(names or self.default)
+
+    def _selection(self, names):
+        requested = {}
+        for name in names:
+            head, _, rest = name.partition('.')
+            field = self.fields.get(head)
+            if field is None or (rest and not isinstance(field, Nested)):
+                raise InvalidFields(
+                    f"Unknown field '{name}'; available: {', '.join(self.fields)}")
+            if isinstance(field, Nested):
+                parts = requested.setdefault(head, [])
+                # A bare nested name means all of its default fields.
+                if parts is not None:
+                    if rest:
+                        parts.append(rest)
+                    else:
+                        requested[head] = None
+            else:
+                requested[head] = None
+
+        selection = []
+        for name, field in self.fields.items():
+            if name not in requested:
+                continue
+            if isinstance(field, Nested):
+                parts = requested[name]
+                selection.append((name, field.projection.parse(','.join(parts or ()))))
+            else:
+                selection.append((name, None))
+        return tuple(selection)
+
+    def columns(self, selection):
+        """The columns to select for `selection`, in row order."""
+        columns = []
+        for name, sub in selection:
+            field = self.fields[name]
+            if sub is None:
+                columns.append(field)
+            else:
+                columns.extend(field.projection.columns(sub))
+        return columns
+
+    def _joins(self, selection):
+        for name, sub in selection:
+            if sub is not None:
+                nested = self.fields[name]
+                target = nested.projection
+                yield target.model, nested.foreign_key == target.fields['id']
+                yield from target._joins(sub)
+
+    def select(self, selection, *extra):
+        """
+        SELECT the columns for `selection` followed by `extra` columns,
+        which the caller can read from the rows (e.g. for a cursor) but
+        ``to_dicts`` leaves out.
+        """
+        query = select(*self.columns(selection), *extra).select_from(self.model)
+        for target, onclause in self._joins(selection):
+            query = query.join(target, onclause)
+        return query
+
+    def to_dicts(self, rows, selection):
+        """Assemble rows from ``select(selection)`` into dicts."""
+        if all(sub is None for _, sub in selection):
+            keys = [name for name, _ in selection]
+            width = len(keys)
+            return [dict(zip(keys, row[:width])) for row in rows]
+
+        def plan(selection, start):
+            steps = []
+            for name, sub in selection:
+                if sub is None:
+                    steps.append((name, start))
+                    start += 1
+                else:
+                    sub_steps, start = plan(sub, start)
+                    steps.append((name, sub_steps))
+            return steps, start
+
+        def build(steps, row):
+            return {name: row[step] if isinstance(step, int) else build(step, row)
+                    for name, step in steps}
+
+        steps, _ = plan(selection, 0)
+        return [build(steps, row) for row in rows]
+
+    def filter(self, item, selection):
+        """Apply `selection` to a dict already shaped like the defaults."""
+        return {name: item[name] if sub is None else self.fields[name].projection.filter(
+                    item[name], sub)
+                for name, sub in selection}
+
+
+def add_fields_argument(parser, projection):
+    """Add the ``fields`` query argument for `projection` to a reqparse parser."""
+    parser.add_argument(
+        'fields', type=str, location='args',
+        help=f"Comma-separated fields to return: {', '.join(projection.fields)}; "
+             "nested objects accept name.field")
+    return parser
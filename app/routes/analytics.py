@@ -0,0 +1,197 @@
+from datetime import datetime
+
+from flask_restx import Namespace, Resource, fields, inputs
+from flask_jwt_extended import jwt_required
+from app.models import User
+from app.analytics import PERIODS, period_totals, plan_breakdown, streaks
+from app.conditional import etag, user_etag
+from app.training_stats import summary
+
+
+analytics_ns = Namespace('analytics', description='Workout Analytics')
+
+period_total_model = analytics_ns.model('PeriodTotal', {
+    'start': fields.Date(description='First day of the week (Monday) or month'),
+    'sessions': fields.Integer(description='Sessions in the period'),
+    'total_duration': fields.Integer(description='Total duration in minutes'),
+})
+
+plan_breakdown_model = analytics_ns.model('PlanBreakdown', {
+    'workout_plan_id': fields.Integer(description='The ID of the workout plan'),
+    'name': fields.String(description='The name of the workout plan'),
+    'sessions': fields.Integer(description='Sessions logged for the plan'),
+    'total_duration': fields.Integer(description='Total duration in minutes'),
+    'average_duration': fields.Float(description='Average duration in minutes'),
+    'last_session': fields.DateTime(description='Date of the latest session'),
+})
+
+period_totals_model = analytics_ns.model('PeriodTotals', {
+    'period': fields.String(description='Bucket size: week or month'),
+    'periods': fields.List(fields.Nested(period_total_model)),
+})
+
+plan_breakdown_list_model = analytics_ns.model('PlanBreakdownList', {
+    'plans': fields.List(fields.Nested(plan_breakdown_model)),
+})
+
+streak_model = analytics_ns.model('Streak', {
+    'current': fields.Integer(description='Length of the run reaching the current period'),
+    'longest': fields.Integer(description='Longest run ever'),
+})
+
+streaks_model = analytics_ns.model('Streaks', {
+    'daily': fields.Nested(streak_model, description='Runs of consecutive days'),
+    'weekly': fields.Nested(streak_model, description='Runs of consecutive weeks'),
+})
+
+plan_total_model = analytics_ns.model('PlanTotal', {
+    'workout_plan_id': fields.Integer(description='The ID of the workout plan'),
+    'name': fields.String(description='The name of the workout plan'),
+    'sessions': fields.Integer(description='Sessions logged for the plan'),
+    'total_duration': fields.Integer(description='Total duration in minutes'),
+})
+
+summary_model = analytics_ns.model('TrainingSummary', {
+    'sessions': fields.Integer(description='Sessions logged'),
+    'total_duration': fields.Integer(description='Total duration in minutes'),
+    'last_session': fields.DateTime(description='Date of the latest session'),
+    'current_streak': fields.Integer(description='Consecutive training days up to today or yesterday'),
+    'plans': fields.List(fields.Nested(plan_total_model)),
+})
+
+
+range_parser = analytics_ns.parser()
+range_parser.add_argument(
+    'start', type=inputs.date_from_iso8601, location='args',
+    help='First day to include (YYYY-MM-DD)')
+range_parser.add_argument(
+    'end', type=inputs.date_from_iso8601, location='args',
+    help='Last day to include (YYYY-MM-DD)')
+
+period_parser = range_parser.copy()
+period_parser.add_argument(
+    'period', type=str, default='week', choices=tuple(PERIODS), location='args',
+    help='Bucket size: week or month')
+
+
+def _parse_range(parser):
+    args = parser.parse_args()
+    if args['start'] and args['end'] and args['start'] > args['end']:
+        return args, ({"message": "start must not be after end"}, 400)
+    return args, None
+
+
+def streak_etag():
+    """Current streaks also change with the (UTC) date, not just the data."""
+    tag = user_etag()
+    return tag and f"{tag}-{datetime.utcnow().date().isoformat()}"
+
+
+@analytics_ns.route('/periods')
+class PeriodTotals(Resource):
+    @analytics_ns.expect(period_parser)
+    @analytics_ns.response(200, 'Success', period_totals_model)
+    @analytics_ns.response(400, 'Invalid date range or period')
+    @analytics_ns.response(401, 'Unauthorized')
+    @analytics_ns.response(404, 'User not found')
+    @jwt_required()
+    @etag(user_etag)
+    def get(self):
+        """
+        Get session counts and total duration per week or month.
+
+        Only periods with at least one session are returned, oldest first.
+
+        **Returns:**
+        - `periods`: list of `{start, sessions, total_duration}`
+        """
+        user = User.get_current_user()
+        if not user:
+            return {"message": "User not found"}, 404
+
+        args, error = _parse_range(period_parser)
+        if error:
+            return error
+
+        return {
+            "period": args['period'],
+            "periods": period_totals(user.id, args['period'], args['start'], args['end']),
+        }, 200
+
+
+@analytics_ns.route('/plans')
+class PlanBreakdown(Resource):
+    @analytics_ns.expect(range_parser)
+    @analytics_ns.response(200, 'Success', plan_breakdown_list_model)
+    @analytics_ns.response(400, 'Invalid date range')
+    @analytics_ns.response(401, 'Unauthorized')
+    @analytics_ns.response(404, 'User not found')
+    @jwt_required()
+    @etag(user_etag)
+    def get(self):
+        """
+        Get per-plan session statistics, most used plan first.
+
+        **Returns:**
+        - `plans`: list of `{workout_plan_id, name, sessions, total_duration,
+          average_duration, last_session}`
+        """
+        user = User.get_current_user()
+        if not user:
+            return {"message": "User not found"}, 404
+
+        args, error = _parse_range(range_parser)
+        if error:
+            return error
+
+        return {"plans": plan_breakdown(user.id, args['start'], args['end'])}, 200
+
+
+@analytics_ns.route('/streaks')
+class Streaks(Resource):
+    @analytics_ns.response(200, 'Success', streaks_model)
+    @analytics_ns.response(401, 'Unauthorized')
+    @analytics_ns.response(404, 'User not found')
+    @jwt_required()
+    @etag(streak_etag)
+    def get(self):
+        """
+        Get current and longest streaks of consecutive training days and weeks.
+
+        A streak is current if it includes today or yesterday (this week or
+        last week for weekly streaks).
+
+        **Returns:**
+        - `daily`: `{current, longest}` in days
+        - `weekly`: `{current, longest}` in weeks
+        """
+        user = User.get_current_user()
+        if not user:
+            return {"message": "User not found"}, 404
+
+        return streaks(user.id), 200
+
+
+@analytics_ns.route('/summary')
+class TrainingSummary(Resource):
+    @analytics_ns.response(200, 'Success', summary_model)
+    @analytics_ns.response(401, 'Unauthorized')
+    @analytics_ns.response(404, 'User not found')
+    @jwt_required()
+    @etag(streak_etag)
+    def get(self):
+        """
+        Get lifetime training totals and per-plan session counts.
+
+        Read from the incrementally maintained summary tables, so the cost
+        does not grow with the number of sessions.
+
+        **Returns:**
+        - `sessions`, `total_duration`, `last_session`, `current_streak`
+        - `plans`: list of `{workout_plan_id, name, sessions, total_duration}`
+        """
+        user = User.get_current_user()
+        if not user:
+            return {"message": "User not found"}, 404
+
+        return summary(user.id), 200
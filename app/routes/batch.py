@@ -0,0 +1,349 @@
+from datetime import datetime, timezone
+
+from flask_restx import Namespace, Resource, fields
+from flask_jwt_extended import jwt_required
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import joinedload
+from werkzeug.exceptions import HTTPException
+from werkzeug.routing import Map, Rule
+from app.models import User, Exercises, ExerciseGoal, SelectedExercise, WorkoutPlan, WorkoutSession
+from app.idempotency import idempotent
+from app import db
+
+
+batch_ns = Namespace('batch', description='Batch Mutations')
+
+batch_operation_model = batch_ns.model('BatchOperation', {
+    'method': fields.String(required=True, enum=['POST', 'PUT', 'DELETE'],
+                            description='HTTP method of the single-item request'),
+    'path': fields.String(required=True, description='Path of the single-item request, '
+                          'e.g. /api/exercise-goals/4'),
+    'body': fields.Raw(description='Request body, as for the single-item request'),
+})
+
+batch_model = batch_ns.model('Batch', {
+    'operations': fields.List(fields.Nested(batch_operation_model), required=True),
+})
+
+batch_result_model = batch_ns.model('BatchResult', {
+    'status': fields.Integer(description='Status the single-item request would have returned'),
+    'body': fields.Raw(description='Response body the single-item request would have returned'),
+})
+
+batch_response_model = batch_ns.model('BatchResponse', {
+    'results': fields.List(fields.Nested(batch_result_model)),
+})
+
+MAX_BATCH_OPERATIONS = 500
+
+# The single-item endpoints a batch can replay.
+OPERATIONS = Map([
+    Rule('/api/workout-sessions', methods=['POST'], endpoint='create_session'),
+    Rule('/api/workout-sessions/<int:id>', methods=['DELETE'], endpoint='delete_session'),
+    Rule('/api/exercise-goals', methods=['POST'], endpoint='create_goal'),
+    Rule('/api/exercise-goals/<int:id>', methods=['PUT'], endpoint='update_goal'),
+    Rule('/api/exercise-goals/<int:id>', methods=['DELETE'], endpoint='delete_goal'),
+    Rule('/api/workout-plans/<int:plan_id>/exercises', methods=['POST'],
+         endpoint='add_plan_exercise'),
+    Rule('/api/workout-plans/<int:plan_id>/exercise/<int:id>', methods=['PUT'],
+         endpoint='update_plan_exercise'),
+    Rule('/api/workout-plans/<int:plan_id>/exercise/<int:id>', methods=['DELETE'],
+         endpoint='delete_plan_exercise'),
+], strict_slashes=False)
+
+GOAL_FIELDS = ('target_sets', 'target_reps', 'target_duration', 'target_distance')
+PLAN_EXERCISE_FIELDS = ('sets', 'reps', 'duration', 'distance')
+
+
+@batch_ns.route('')
+class Batch(Resource):
+    @batch_ns.expect(batch_model)
+    @batch_ns.response(200, 'All operations applied', batch_response_model)
+    @batch_ns.response(400, 'Invalid batch or operation; nothing applied', batch_response_model)
+    @batch_ns.response(401, 'Unauthorized')
+    @batch_ns.response(404, 'User not found')
+    @jwt_required()
+    @idempotent
+    def post(self):
+        """
+        Apply a list of changes in one transaction.
+
+        Each operation replays a single-item request (`method`, `path` and
+        `body`) against workout sessions, exercise goals or workout plan
+        exercises, in order. Ids referenced by all operations are checked
+        with one query per table, and everything is committed at once:
+        if any operation fails, none are applied.
+
+        **Returns:**
+        - 200: `results`, the status and body each request would have
+          returned, in order.
+        - 400: `results` with the failed operations' errors; the others
+          have status 424 (not applied).
+        """
+        user = User.get_current_user()
+        if not user:
+            return {"message": "User not found"}, 404
+
+        data = batch_ns.payload or {}
+        operations = data.get('operations')
+        if not isinstance(operations, list) or not operations:
+            return {"message": "operations must be a non-empty list"}, 400
+        if len(operations) > MAX_BATCH_OPERATIONS:
+            return {"message": f"At most {MAX_BATCH_OPERATIONS} operations per batch"}, 400
+
+        ok, results = apply_operations(user.id, operations)
+        if not ok:
+            db.session.rollback()
+            return {"message": "No operations were applied", "results": results}, 400
+
+        try:
+            db.session.commit()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            return {"message": str(e)}, 400
+        return {"results": results}, 200
+
+
+class OperationError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _resolve(operation):
+    """Return ``(endpoint, args, body)`` for an operation, or raise OperationError."""
+    if not isinstance(operation, dict) or not isinstance(operation.get('path'), str):
+        raise OperationError(400, 'Each operation needs a method and a path')
+    try:
+        endpoint, args = OPERATIONS.bind('localhost').match(
+            operation['path'], method=str(operation.get('method', '')).upper())
+    except HTTPException as e:
+        raise OperationError(e.code, f"{operation.get('method')} {operation['path']} "
+                                     "is not supported in a batch")
+    body = operation.get('body') or {}
+    if not isinstance(body, dict):
+        raise OperationError(400, 'body must be an object')
+    return endpoint, args, body
+
+
+def _integer(body, field, required=False):
+    value = body.get(field)
+    if value is None:
+        if required:
+            raise OperationError(400, f'{field} is required')
+        return None
+    if not isinstance(value, int) or isinstance(value, bool):
+        raise OperationError(400, f'{field} must be an integer')
+    return value
+
+
+class _Context:
+    """Rows the batch refers to, loaded with one query per table."""
+
+    def __init__(self, user_id, resolved):
+        ids = {name: [] for name in ('exercise', 'plan', 'goal', 'session', 'selected')}
+        for endpoint, args, body in resolved:
+            if endpoint.endswith('session'):
+                ids['session'].append(args.get('id'))
+                ids['plan'].append(body.get('workout_plan_id'))
+            elif endpoint.endswith('goal'):
+                ids['goal'].append(args.get('id'))
+                ids['exercise'].append(body.get('exercise_id'))
+            else:
+                ids['plan'].append(args['plan_id'])
+                ids['selected'].append(args.get('id'))
+                ids['exercise'].append(body.get('exercise_id'))
+        # Collected as lists: body values may be unhashable. Malformed ids
+        # are reported by the operations themselves.
+        ids = {name: {id for id in values if isinstance(id, int) and not isinstance(id, bool)}
+               for name, values in ids.items()}
+
+        def load(query):
+            return {row.id: row for row in db.session.execute(query).scalars()}
+
+        self.user_id = user_id
+        self.exercises = load(db.select(Exercises).where(
+            Exercises.id.in_(ids['exercise']))) if ids['exercise'] else {}
+        self.plan_ids = set(db.session.execute(db.select(WorkoutPlan.id).where(
+            WorkoutPlan.id.in_(ids['plan']), WorkoutPlan.user_id == user_id)).scalars()
+        ) if ids['plan'] else set()
+        self.goals = load(db.select(ExerciseGoal).options(joinedload(ExerciseGoal.exercises))
+                          .where(ExerciseGoal.id.in_(ids['goal']),
+                                 ExerciseGoal.user_id == user_id)) if ids['goal'] else {}
+        self.sessions = load(db.select(WorkoutSession).where(
+            WorkoutSession.id.in_(ids['session']),
+            WorkoutSession.user_id == user_id)) if ids['session'] else {}
+        self.selected = load(
+            db.select(SelectedExercise).options(joinedload(SelectedExercise.exercise))
+            .join(WorkoutPlan).where(SelectedExercise.id.in_(ids['selected']),
+                                     WorkoutPlan.user_id == user_id)) if ids['selected'] else {}
+
+    def exercise(self, body, required=False):
+        exercise_id = _integer(body, 'exercise_id', required)
+        if exercise_id is None:
+            return None
+        if exercise_id not in self.exercises:
+            raise OperationError(404, 'Exercise not found')
+        return self.exercises[exercise_id]
+
+    def plan(self, plan_id):
+        if plan_id not in self.plan_ids:
+            raise OperationError(404, 'Workout plan not found')
+        return plan_id
+
+    def goal(self, id):
+        # Deleted goals are popped, so later operations see them as gone.
+        if id not in self.goals:
+            raise OperationError(404, 'Exercise goal not found')
+        return self.goals[id]
+
+    def selected_exercise(self, plan_id, id):
+        self.plan(plan_id)
+        selected = self.selected.get(id)
+        if selected is None or selected.workout_plan_id != plan_id:
+            raise OperationError(404, 'Selected exercise not found in this workout plan')
+        return selected
+
+
+def create_session(ctx, args, body):
+    plan_id = ctx.plan(_integer(body, 'workout_plan_id', required=True))
+    duration = _integer(body, 'duration', required=True)
+    date = None
+    if body.get('date') is not None:
+        try:
+            date = datetime.fromisoformat(str(body['date']).replace('Z', '+00:00'))
+        except ValueError:
+            raise OperationError(400, 'date must be an ISO 8601 date and time')
+        if date.tzinfo is not None:
+            # Stored as naive UTC, like the other session dates
+            date = date.astimezone(timezone.utc).replace(tzinfo=None)
+    session = WorkoutSession(user_id=ctx.user_id, workout_plan_id=plan_id, date=date,
+                             duration=duration, notes=body.get('notes'))
+    db.session.add(session)
+    return 201, 'Workout session created successfully', 'workout_session', session
+
+
+def delete_session(ctx, args, body):
+    session = ctx.sessions.pop(args['id'], None)
+    if session is None:
+        raise OperationError(404, 'Workout session not found')
+    db.session.delete(session)
+    return 200, 'Workout session deleted successfully', None, None
+
+
+def create_goal(ctx, args, body):
+    exercise = ctx.exercise(body, required=True)
+    targets = {field: body.get(field) for field in GOAL_FIELDS}
+    _integer(body, 'target_sets', required=True)
+    _integer(body, 'target_reps', required=True)
+    goal = ExerciseGoal(exercise_id=exercise.id, user_id=ctx.user_id, **targets)
+    db.session.add(goal)
+    return 201, 'Exercise goal created successfully', 'exercise_goal', goal
+
+
+def update_goal(ctx, args, body):
+    goal = ctx.goal(args['id'])
+    exercise = ctx.exercise(body)
+    for field in ('target_sets', 'target_reps'):
+        if field in body:
+            _integer(body, field, required=True)
+    if exercise is not None:
+        goal.exercise_id = exercise.id
+        # Reloaded from the identity map after the flush
+        db.session.expire(goal, ['exercises'])
+    for field in GOAL_FIELDS:
+        if field in body:
+            setattr(goal, field, body[field])
+    return 200, 'Exercise goal updated successfully', 'exercise_goal', goal
+
+
+def delete_goal(ctx, args, body):
+    goal = ctx.goal(args['id'])
+    del ctx.goals[args['id']]
+    db.session.delete(goal)
+    return 200, 'Exercise goal deleted successfully', None, None
+
+
+def add_plan_exercise(ctx, args, body):
+    plan_id = ctx.plan(args['plan_id'])
+    exercise = ctx.exercise(body, required=True)
+    for field in ('sets', 'reps'):
+        _integer(body, field)
+    selected = SelectedExercise(workout_plan_id=plan_id, exercise_id=exercise.id,
+                                **{field: body.get(field) for field in PLAN_EXERCISE_FIELDS})
+    db.session.add(selected)
+    return 201, 'Exercise added successfully', 'exercise', selected
+
+
+def update_plan_exercise(ctx, args, body):
+    selected = ctx.selected_exercise(args['plan_id'], args['id'])
+    for field in ('sets', 'reps'):
+        _integer(body, field)
+    for field in PLAN_EXERCISE_FIELDS:
+        if field in body:
+            setattr(selected, field, body[field])
+    return 200, 'Exercise updated successfully', 'exercise', selected
+
+
+def delete_plan_exercise(ctx, args, body):
+    selected = ctx.selected_exercise(args['plan_id'], args['id'])
+    del ctx.selected[args['id']]
+    db.session.delete(selected)
+    return 204, None, None, None
+
+
+HANDLERS = {handler.__name__: handler for handler in (
+    create_session, delete_session, create_goal, update_goal, delete_goal,
+    add_plan_exercise, update_plan_exercise, delete_plan_exercise)}
+
+
+def apply_operations(user_id, operations):
+    """
+    Apply `operations` to the session, in order, without committing.
+
+    Every operation is checked, even after one fails, so all errors are
+    reported at once. Returns ``(ok, results)`` with one ``{status, body}``
+    per operation; if not ok, the failed operations carry their error and
+    the rest status 424, and the caller must roll back.
+    """
+    resolved = []
+    errors = {}
+    for index, operation in enumerate(operations):
+        try:
+            resolved.append(_resolve(operation))
+        except OperationError as e:
+            errors[index] = e
+            resolved.append(None)
+
+    ctx = _Context(user_id, [op for op in resolved if op is not None])
+    outcomes = []
+    # Deletes load cascaded children; don't flush half a batch for them.
+    with db.session.no_autoflush:
+        for index, op in enumerate(resolved):
+            outcome = None
+            if op is not None:
+                endpoint, args, body = op
+                try:
+                    outcome = HANDLERS[endpoint](ctx, args, body)
+                except OperationError as e:
+                    errors[index] = e
+            outcomes.append(outcome)
+
+    if errors:
+        return False, [
+            {'status': errors[index].status, 'body': {'message': errors[index].message}}
+            if index in errors else {'status': 424, 'body': {'message': 'Not applied'}}
+            for index in range(len(operations))]
+
+    # One flush for the whole batch assigns ids and dates for the bodies.
+    db.session.flush()
+    results = []
+    for status, message, key, obj in outcomes:
+        body = None
+        if message is not None:
+            body = {'message': message}
+            if key is not None:
+                body[key] = obj.to_dict()
+        results.append({'status': status, 'body': body})
+    return True, results
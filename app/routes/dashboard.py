@@ -0,0 +1,49 @@
+from flask_restx import Namespace, Resource, fields
+from flask_jwt_extended import jwt_required
+from app.models import User
+from app.conditional import etag, user_catalog_etag
+from app.dashboard import dashboard
+
+
+dashboard_ns = Namespace('dashboard', description='Home Screen Dashboard')
+
+dashboard_model = dashboard_ns.model('Dashboard', {
+    'profile': fields.Raw(description='current_weight, height, age, body_fat_percentage, muscle_mass'),
+    'fitness_goal': fields.Raw(description='target_weight, target_muscle_mass, target_body_fat_percentage'),
+    'exercise_goals': fields.List(fields.Raw, description='Goals with the exercise id and name'),
+    'workout_plans': fields.List(fields.Raw, description='Plan summaries'),
+    'workout_sessions': fields.Raw(description='{items, next_cursor}: the newest sessions'),
+    'incomplete': fields.List(fields.String, description='Sections left null'),
+})
+
+
+@dashboard_ns.route('')
+class Dashboard(Resource):
+    @dashboard_ns.response(200, 'Success', dashboard_model)
+    @dashboard_ns.response(401, 'Unauthorized')
+    @dashboard_ns.response(404, 'User not found')
+    @jwt_required()
+    @etag(user_catalog_etag)
+    def get(self):
+        """
+        Get everything the home screen shows in one request.
+
+        Sections are read concurrently. Those not ready within the
+        configured time budget are null and named in `incomplete`; fetch
+        them from their own endpoints. Pass `workout_sessions.next_cursor`
+        to `/api/workout-sessions` for older sessions.
+
+        **Returns:**
+        - `profile`, `fitness_goal`
+        - `exercise_goals`, `workout_plans`: lists
+        - `workout_sessions`: `{items, next_cursor}`
+        - `incomplete`: names of sections left out
+        """
+        user = User.get_current_user()
+        if not user:
+            return {"message": "User not found"}, 404
+
+        payload, complete = dashboard.build(user.id)
+        if not complete:
+            return payload, 200, {'Cache-Control': 'no-store'}
+        return payload, 200
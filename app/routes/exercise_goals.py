@@ -1,6 +1,10 @@
 from flask_restx import Namespace, Resource, fields
 from flask_jwt_extended import jwt_required
 from app.models import Exercises, User, ExerciseGoal
+from app.shapes import EXERCISE_GOAL_FIELDS
+from app.projection import InvalidFields, add_fields_argument
+from app.conditional import etag, user_catalog_etag
+from app.idempotency import idempotent
 from app import db
 
 
@@ -25,22 +29,33 @@ exercise_goal_model = exercises_goals_ns.model('ExerciseGoal', {
 })
 
 
+exercise_goal_list_parser = add_fields_argument(
+    exercises_goals_ns.parser(), EXERCISE_GOAL_FIELDS)
+
+
 @exercises_goals_ns.route("")
 class ExerciseGoalsList(Resource):
     """
     Resource for managing exercise goals.
     """
 
+    @exercises_goals_ns.expect(exercise_goal_list_parser)
     @exercises_goals_ns.response(200, "Success", [exercise_model])
+    @exercises_goals_ns.response(400, "Unknown field")
     @exercises_goals_ns.response(401, "Unauthorized")
     @exercises_goals_ns.response(404, "User not found")
     @jwt_required()
+    @etag(user_catalog_etag)
     def get(self):
         """
         Get a list of exercise goals for the authenticated user.
 
+        `fields` limits the columns returned; the nested exercise is only
+        included when `exercise` or `exercise.<field>` is requested.
+
         Returns:
             200: A list of exercise goals.
+            400: If `fields` names an unknown field.
             401: Unauthorized access.
             404: If the user is not found.
         """
@@ -48,8 +63,16 @@ class ExerciseGoalsList(Resource):
         if not user:
             return {"message": "User not found"}, 404
 
-        exercise_goals = ExerciseGoal.query.filter_by(user_id=user.id).all()
-        return {"exercise_goals": [exercise_goal.to_dict() for exercise_goal in exercise_goals]}, 200
+        args = exercise_goal_list_parser.parse_args()
+        try:
+            selection = EXERCISE_GOAL_FIELDS.parse(args['fields'])
+        except InvalidFields as e:
+            return {"message": str(e)}, 400
+
+        query = EXERCISE_GOAL_FIELDS.select(selection).where(
+            ExerciseGoal.user_id == user.id).order_by(ExerciseGoal.id)
+        exercise_goals = EXERCISE_GOAL_FIELDS.to_dicts(db.session.execute(query), selection)
+        return {"exercise_goals": exercise_goals}, 200
 
     @exercises_goals_ns.expect(exercise_goal_model)
     @exercises_goals_ns.response(201, "Exercise goal created successfully")
@@ -57,6 +80,7 @@ class ExerciseGoalsList(Resource):
     @exercises_goals_ns.response(401, "Unauthorized")
     @exercises_goals_ns.response(404, "User not found")
     @jwt_required()
+    @idempotent
     def post(self):
         """
         Create a new exercise goal for the authenticated user.
@@ -97,6 +121,7 @@ class SingleExerciseGoal(Resource):
     @exercises_goals_ns.response(200, "Success")
     @exercises_goals_ns.response(404, "Exercise goal not found")
     @jwt_required()
+    @etag(user_catalog_etag)
     def get(self, exercise_goal_id):
         """
         Retrieve a single exercise goal by ID.
@@ -1,6 +1,14 @@
+from flask import current_app
 from flask_restx import Namespace, Resource, fields
 from flask_jwt_extended import jwt_required
-from app.models import Exercises, User
+from app.models import Exercises, Muscle, User
+from app import db
+from app.catalog import catalog_cache, serialize
+from app.compression import precompressed
+from app.conditional import etag, catalog_etag
+from app.projection import InvalidFields, add_fields_argument
+from app.shapes import EXERCISE_FIELDS
+from app.search import get_index
 
 exercises_ns = Namespace('exercises', description='Exercises')
 
@@ -14,26 +22,128 @@ exercise_model = exercises_ns.model('Exercise', {
 })
 
 
+def json_response(body, status=200):
+    # Catalog bodies only change with the catalog version in the ETag.
+    return precompressed(current_app.response_class(
+        body, status=status, mimetype='application/json'))
+
+
+exercise_list_parser = exercises_ns.parser()
+exercise_list_parser.add_argument('muscle', type=str, location='args',
+                                  help='Only exercises targeting this muscle')
+add_fields_argument(exercise_list_parser, EXERCISE_FIELDS)
+
+
 @exercises_ns.route("")
 class ExercisesList(Resource):
+    @exercises_ns.expect(exercise_list_parser)
     @exercises_ns.response(200, 'Success', [exercise_model])
-    @exercises_ns.response(404, 'Exercises Not Found')
+    @exercises_ns.response(400, 'Unknown field')
+    @exercises_ns.response(404, 'Catalog is empty')
+    @etag(catalog_etag)
     def get(self):
-        exercises = Exercises.query.all()
+        args = exercise_list_parser.parse_args()
+        muscle = args['muscle'].strip().lower() if args['muscle'] else None
+        try:
+            selection = EXERCISE_FIELDS.parse(args['fields'])
+        except InvalidFields as e:
+            return {'message': str(e)}, 400
+
+        # Only muscles in the catalog get cache entries, so arbitrary
+        # values cannot grow the cache.
+        if muscle and muscle not in catalog_cache.get(('muscles',), self._muscles):
+            return json_response(serialize({'exercises': []}))
+
+        body = catalog_cache.get(('exercises', muscle, selection),
+                                 lambda: self._build(muscle, selection))
 
-        if not exercises:
+        if body is None:
             return {'message': 'Exercises not found'}, 404
 
-        return {'exercises': [exercise.to_dict() for exercise in exercises]}, 200
+        return json_response(body)
+
+    @staticmethod
+    def _muscles():
+        return frozenset(db.session.execute(db.select(db.func.lower(Muscle.name))).scalars())
+
+    @staticmethod
+    def _build(muscle, selection):
+        query = EXERCISE_FIELDS.select(selection)
+        if muscle:
+            # muscles -> exercise_muscles(muscle_id) index -> exercises PK
+            query = query.join(Exercises.muscles).where(
+                db.func.lower(Muscle.name) == muscle)
+        exercises = EXERCISE_FIELDS.to_dicts(
+            db.session.execute(query.order_by(Exercises.id)), selection)
+
+        if not exercises and not muscle:
+            return None
+
+        return serialize({'exercises': exercises})
+
+
+search_parser = exercises_ns.parser()
+search_parser.add_argument('q', type=str, location='args',
+                           help='Words to match by prefix in name and description')
+search_parser.add_argument('muscle', type=str, action='append', location='args',
+                           help='Target muscle filter; repeat to match any of several')
+search_parser.add_argument('difficulty', type=int, location='args',
+                           help='Difficulty filter')
+search_parser.add_argument('limit', type=int, default=20, location='args',
+                           help='Maximum number of exercises to return (1-100)')
+add_fields_argument(search_parser, EXERCISE_FIELDS)
+
+search_result_model = exercises_ns.model('ExerciseSearchResult', {
+    'total': fields.Integer(description='Number of matching exercises'),
+    'exercises': fields.List(fields.Nested(exercise_model)),
+    'facets': fields.Raw(description='Counts per muscle and per difficulty'),
+})
+
+
+@exercises_ns.route("/search")
+class ExerciseSearch(Resource):
+    @exercises_ns.expect(search_parser)
+    @exercises_ns.response(200, 'Success', search_result_model)
+    @exercises_ns.response(400, 'Invalid limit or unknown field')
+    @etag(catalog_etag)
+    def get(self):
+        """
+        Search the exercise catalog.
+
+        Every word in `q` must prefix-match a word in the exercise name or
+        description; name matches are listed first. Facet counts are
+        returned for target muscles and difficulty.
+        """
+        args = search_parser.parse_args()
+        if not 1 <= args['limit'] <= 100:
+            return {'message': 'limit must be between 1 and 100'}, 400
+        try:
+            selection = EXERCISE_FIELDS.parse(args['fields'])
+        except InvalidFields as e:
+            return {'message': str(e)}, 400
+
+        total, exercises, facets = get_index().search(
+            q=args['q'], muscles=args['muscle'] or (),
+            difficulty=args['difficulty'], limit=args['limit'])
+
+        if args['fields']:
+            exercises = [EXERCISE_FIELDS.filter(exercise, selection) for exercise in exercises]
+        return {'total': total, 'exercises': exercises, 'facets': facets}, 200
 
 
 @exercises_ns.route("/<int:exercise_id>")
 class Exercise(Resource):
     @exercises_ns.response(200, 'Success', exercise_model)
     @exercises_ns.response(404, 'Exercise Not Found')
+    @etag(catalog_etag)
     def get(self, exercise_id):
-        exercise = Exercises.query.filter_by(id=exercise_id).first()
-        if exercise:
-            return {'exercise': exercise.to_dict()}, 200
+        def build():
+            exercise = Exercises.query.filter_by(id=exercise_id).first()
+            if exercise:
+                return serialize({'exercise': exercise.to_dict()})
+
+        body = catalog_cache.get(('exercise', exercise_id), build, cache_empty=False)
+        if body:
+            return json_response(body)
         else:
             return {'message': 'Exercise not found'}, 404
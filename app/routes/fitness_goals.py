@@ -2,6 +2,7 @@ from flask_restx import Namespace, Resource, fields
 from flask_jwt_extended import  jwt_required
 from app import db
 from app.models import User, FitnessGoal
+from app.conditional import etag, user_etag
 
 fitness_goals_ns = Namespace('fitness-goals', description='Fitness Goals')
 
@@ -19,6 +20,7 @@ class FitnessGoalResource(Resource):
     @fitness_goals_ns.response(200, 'Fitness Goal retrieved successfully', fitness_goal_model)
     @fitness_goals_ns.response(401, 'Unauthorized')
     @fitness_goals_ns.response(404, 'User not found')
+    @etag(user_etag)
     def get(self):
         """Get current user's profile information"""
         current_user = User.get_current_user()
@@ -0,0 +1,24 @@
+from flask_restx import Namespace, Resource
+from app import db
+from app.config import pool_status
+
+health_ns = Namespace('health', description='Service health')
+
+
+@health_ns.route('')
+class Health(Resource):
+    @health_ns.response(200, 'Service is healthy')
+    @health_ns.response(503, 'Database unavailable')
+    def get(self):
+        """
+        Check database connectivity and report connection pool usage.
+        """
+        try:
+            db.session.execute(db.text('SELECT 1'))
+        except Exception as e:
+            return {"status": "error", "message": str(e)}, 503
+
+        return {
+            "status": "ok",
+            "database": {"pool": pool_status(db.engine)},
+        }, 200
@@ -0,0 +1,60 @@
+from flask import Response, stream_with_context
+from flask_restx import Namespace, Resource, fields
+from flask_jwt_extended import jwt_required
+from app.models import User
+from app.sync import ExpiredToken, InvalidToken, stream_changes
+
+
+sync_ns = Namespace('sync', description='Delta Sync')
+
+sync_model = sync_ns.model('SyncResponse', {
+    'next': fields.String(description='Token to send as `since` on the next sync'),
+    'full': fields.Boolean(description='True if all rows were returned (no `since` given)'),
+    'changes': fields.Raw(description='Changed rows per table: {table: [row, ...]}'),
+    'deleted': fields.Raw(description='Deleted row ids per table: {table: [id, ...]}'),
+})
+
+sync_parser = sync_ns.parser()
+sync_parser.add_argument(
+    'since', type=str, location='args',
+    help='Token from the previous sync; omit for a full sync')
+
+
+@sync_ns.route('')
+class Sync(Resource):
+    @sync_ns.expect(sync_parser)
+    @sync_ns.response(200, 'Success', sync_model)
+    @sync_ns.response(400, 'Invalid token')
+    @sync_ns.response(401, 'Unauthorized')
+    @sync_ns.response(404, 'User not found')
+    @sync_ns.response(410, 'Token expired, sync again without one')
+    @jwt_required()
+    def get(self):
+        """
+        Get the plans, plan exercises, goals and sessions changed since the
+        last sync.
+
+        Without `since`, every row is returned. Rows are sent whole and may
+        repeat across syncs, so clients should apply them as upserts and
+        remove the ids listed in `deleted`. The response is streamed.
+
+        **Returns:**
+        - `next`: token for the next sync
+        - `full`: whether this was a full sync
+        - `changes`: `workout_plans`, `selected_exercises`, `exercise_goals`,
+          `workout_sessions`, `fitness_goals`, each a list of rows
+        - `deleted`: ids per table removed since the token
+        """
+        user = User.get_current_user()
+        if not user:
+            return {"message": "User not found"}, 404
+
+        args = sync_parser.parse_args()
+        try:
+            body = stream_changes(user.id, args['since'])
+        except InvalidToken as e:
+            return {"message": str(e)}, 400
+        except ExpiredToken as e:
+            return {"message": str(e)}, 410
+
+        return Response(stream_with_context(body), mimetype='application/json')
@@ -4,9 +4,23 @@ from flask_jwt_extended import create_access_token, get_jwt_identity, jwt_requir
 from datetime import timedelta
 from app import db
 from app.models import User, UserProfile, FitnessGoal
+from app.conditional import etag, user_etag
+from app.hashing import HashingBusy, HashingUnavailable
 
 user_ns = Namespace('user', description='User')
 
+
+@user_ns.errorhandler(HashingBusy)
+def handle_hashing_busy(error):
+    """Too many password hashes in flight; ask the client to retry."""
+    return {"error": "Too many requests", "message": "Server is busy, please retry shortly."}, 429, {"Retry-After": "1"}
+
+
+@user_ns.errorhandler(HashingUnavailable)
+def handle_hashing_unavailable(error):
+    """A hash timed out or its worker process died; the client may retry."""
+    return {"error": "Service unavailable", "message": "Server is busy, please retry shortly."}, 503, {"Retry-After": "1"}
+
 user_model = user_ns.model('User', {
     'id': fields.Integer(readOnly=True, description='The user unique identifier'),
     'username': fields.String(required=True, description='The username'),
@@ -29,6 +43,8 @@ class Register(Resource):
     @user_ns.response(201, 'User registered successfully')
     @user_ns.response(400, 'Missing required fields')
     @user_ns.response(409, 'Username already taken')
+    @user_ns.response(429, 'Too many requests')
+    @user_ns.response(503, 'Password hashing unavailable')
     def post(self):
         """Register a new user"""
         data = request.get_json()
@@ -63,6 +79,8 @@ class Login(Resource):
     @user_ns.response(200, 'Login successful')
     @user_ns.response(400, 'Missing required fields')
     @user_ns.response(401, 'Invalid credentials')
+    @user_ns.response(429, 'Too many requests')
+    @user_ns.response(503, 'Password hashing unavailable')
     def post(self):
         """Login a user"""
         data = request.get_json()
@@ -77,6 +95,11 @@ class Login(Resource):
         if not user or not user.check_password(password):
             return {"error": "Invalid credentials", "message": "Invalid username or password."}, 401
 
+        # Upgrade hashes made with old PASSWORD_HASH_METHOD parameters.
+        if user.password_needs_rehash():
+            user.set_password(password)
+            db.session.commit()
+
         access_token = create_access_token(
             identity=str(user.id), expires_delta=timedelta(days=1))
 
@@ -103,6 +126,7 @@ class UserProfileResource(Resource):
     @user_ns.response(200, 'Profile retrieved successfully', profile_model)
     @user_ns.response(401, 'Unauthorized')
     @user_ns.response(404, 'Profile not found')
+    @etag(user_etag)
     def get(self):
         """Get current user's profile information"""
         current_user = User.get_current_user()
@@ -1,7 +1,11 @@
-from flask import jsonify
 from flask_restx import Namespace, Resource, fields
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy.orm import selectinload
 from app.models import WorkoutPlan, SelectedExercise, User, Exercises
+from app.shapes import PLAN_DETAIL, WORKOUT_PLAN_SUMMARY_FIELDS
+from app.projection import InvalidFields, add_fields_argument
+from app.conditional import etag, user_catalog_etag, user_etag
+from app.idempotency import idempotent
 from app import db
 
 
@@ -31,7 +35,7 @@ selected_exercise_response = workout_plans_ns.model('SelectedExerciseResponse',
 
 # Model for selected exercises
 selected_exercise_model = workout_plans_ns.model('SelectedExercise', {
-    'exercise-id': fields.Integer(required=True),
+    'exercise_id': fields.Integer(required=True),
     'sets': fields.Integer,
     'reps': fields.Integer,
     'duration': fields.String,
@@ -58,6 +62,27 @@ workout_plan_response = workout_plans_ns.model('WorkoutPlanResponse', {
 })
 
 
+# Bulk create / clone request
+workout_plan_bulk_entry = workout_plans_ns.model('WorkoutPlanBulkEntry', {
+    'clone_from': fields.Integer(description='ID of one of your plans to copy'),
+    'name': fields.String,
+    'frequency': fields.String,
+    'session_duration': fields.Integer,
+    'selected_exercises': fields.List(fields.Nested(selected_exercise_model)),
+})
+
+workout_plan_bulk_model = workout_plans_ns.model('WorkoutPlanBulk', {
+    'workout_plans': fields.List(fields.Nested(workout_plan_bulk_entry), required=True),
+})
+
+workout_plan_bulk_response = workout_plans_ns.model('WorkoutPlanBulkResponse', {
+    'message': fields.String,
+    'workout_plans': fields.List(fields.Nested(workout_plan_response)),
+})
+
+MAX_BULK_PLANS = 100
+
+
 workout_plan_summary_response = workout_plans_ns.model('WorkoutPlanSummaryResponse', {
     'id': fields.Integer,
     'name': fields.String,
@@ -73,18 +98,32 @@ workout_plan_summary = workout_plans_ns.model('WorkoutPlanSummary', {
 })
 
 
+workout_plan_summary_parser = add_fields_argument(
+    workout_plans_ns.parser(), WORKOUT_PLAN_SUMMARY_FIELDS)
+
+
 @workout_plans_ns.route('/summary')
 class WorkoutPlanSummaryList(Resource):
+    @workout_plans_ns.expect(workout_plan_summary_parser)
     @workout_plans_ns.response(200, 'Workout plan created successfully', workout_plan_summary_response)
+    @workout_plans_ns.response(400, 'Unknown field')
     @jwt_required()
+    @etag(user_etag)
     def get(self):
         """Get all workout plan summaries for current user"""
         user = User.get_current_user()
         if not user:
-            return jsonify({"message": "User not found"}), 404
+            return {"message": "User not found"}, 404
+
+        args = workout_plan_summary_parser.parse_args()
+        try:
+            selection = WORKOUT_PLAN_SUMMARY_FIELDS.parse(args['fields'])
+        except InvalidFields as e:
+            return {"message": str(e)}, 400
 
-        plans = WorkoutPlan.query.filter_by(user_id=user.id).all()
-        return [plan.to_summary() for plan in plans]
+        query = WORKOUT_PLAN_SUMMARY_FIELDS.select(selection).where(
+            WorkoutPlan.user_id == user.id).order_by(WorkoutPlan.id)
+        return WORKOUT_PLAN_SUMMARY_FIELDS.to_dicts(db.session.execute(query), selection)
 
 
 @workout_plans_ns.route('')
@@ -95,6 +134,7 @@ class WorkoutPlanResource(Resource):
     @workout_plans_ns.response(404, 'User not found')
     @workout_plans_ns.response(500, 'Server error')
     @jwt_required()
+    @idempotent
     def post(self):
         """Create a new workout plan with exercises"""
         user = User.get_current_user()
@@ -109,35 +149,11 @@ class WorkoutPlanResource(Resource):
             return {'message': 'Missing required fields'}, 400
 
         try:
-            # Create workout plan
-            workout_plan = WorkoutPlan(
-                user_id=user.id,
-                name=data['name'],
-                frequency=data.get('frequency'),
-                session_duration=data.get('session_duration')
-            )
-            db.session.add(workout_plan)
-            db.session.flush()
-
-            # Add exercises to plan
-            for exercise_data in data['selected_exercises']:
-                exercise = Exercises.query.get(
-                    exercise_data.get('exercise_id'))
-                if not exercise:
-                    raise ValueError('Exercise not found')
-
-                # Create selected exercise
-                selected_exercise = SelectedExercise(
-                    workout_plan_id=workout_plan.id,
-                    exercise_id=exercise.id,
-                    sets=exercise_data.get('sets'),
-                    reps=exercise_data.get('reps'),
-                    duration=exercise_data.get('duration'),
-                    distance=exercise_data.get('distance')
-                )
-                db.session.add(selected_exercise)
-
+            workout_plan, = create_plans(user.id, [data])
             db.session.commit()
+
+            workout_plan = WorkoutPlan.query.options(
+                *PLAN_DETAIL).filter_by(id=workout_plan.id).first()
             return {'message': 'Workout plan created successfully', 'workout_plan': workout_plan.to_dict()}, 201
 
         except Exception as e:
@@ -145,6 +161,127 @@ class WorkoutPlanResource(Resource):
             return {'message': str(e)}, 400
 
 
+@workout_plans_ns.route('/bulk')
+class WorkoutPlanBulkResource(Resource):
+    @workout_plans_ns.expect(workout_plan_bulk_model)
+    @workout_plans_ns.response(201, 'Workout plans created successfully', workout_plan_bulk_response)
+    @workout_plans_ns.response(400, 'Validation error')
+    @workout_plans_ns.response(404, 'User or source workout plan not found')
+    @jwt_required()
+    @idempotent
+    def post(self):
+        """
+        Create or clone several workout plans at once.
+
+        Each entry is either a full plan (`name`, `selected_exercises`, ...)
+        or `{"clone_from": <plan_id>}` to copy one of the user's plans,
+        optionally overriding `name`, `frequency` or `session_duration`.
+        All plans are created in one transaction; if any entry is invalid,
+        none are created.
+        """
+        user = User.get_current_user()
+        if not user:
+            return {"message": "User not found"}, 404
+
+        data = workout_plans_ns.payload or {}
+        entries = data.get('workout_plans')
+        if not isinstance(entries, list) or not entries:
+            return {'message': 'workout_plans must be a non-empty list'}, 400
+        if len(entries) > MAX_BULK_PLANS:
+            return {'message': f'At most {MAX_BULK_PLANS} workout plans per request'}, 400
+
+        for entry in entries:
+            if not isinstance(entry, dict):
+                return {'message': 'Each workout plan must be an object'}, 400
+            clone_from = entry.get('clone_from')
+            if 'clone_from' in entry and (not isinstance(clone_from, int)
+                                          or isinstance(clone_from, bool)):
+                return {'message': 'clone_from must be a workout plan ID'}, 400
+
+        # Expand clones into plain plan payloads
+        clone_ids = {entry['clone_from'] for entry in entries if 'clone_from' in entry}
+        sources = {}
+        if clone_ids:
+            sources = {plan.id: plan for plan in WorkoutPlan.query.options(
+                selectinload(WorkoutPlan.selected_exercises)).filter(
+                WorkoutPlan.id.in_(clone_ids), WorkoutPlan.user_id == user.id)}
+            if len(sources) != len(clone_ids):
+                return {'message': 'Workout plan not found'}, 404
+
+        plans = []
+        for entry in entries:
+            if 'clone_from' in entry:
+                source = sources[entry['clone_from']]
+                entry = {
+                    'name': entry.get('name', source.name),
+                    'frequency': entry.get('frequency', source.frequency),
+                    'session_duration': entry.get('session_duration', source.session_duration),
+                    'selected_exercises': [{
+                        'exercise_id': se.exercise_id, 'sets': se.sets, 'reps': se.reps,
+                        'duration': se.duration, 'distance': se.distance,
+                    } for se in source.selected_exercises],
+                }
+            elif not all(field in entry for field in ('name', 'selected_exercises')):
+                return {'message': 'Missing required fields'}, 400
+            plans.append(entry)
+
+        try:
+            ids = [plan.id for plan in create_plans(user.id, plans)]
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            return {'message': str(e)}, 400
+
+        created = {plan.id: plan for plan in WorkoutPlan.query.options(
+            *PLAN_DETAIL).filter(WorkoutPlan.id.in_(ids))}
+        return {
+            'message': 'Workout plans created successfully',
+            'workout_plans': [created[id].to_dict() for id in ids],
+        }, 201
+
+
+def create_plans(user_id, plans):
+    """
+    Add workout plans with their selected exercises to the session.
+
+    All exercise ids across `plans` are validated with one IN query and the
+    selected exercises are written with a single bulk INSERT, so the number
+    of statements does not depend on plan size. Raises ValueError if an
+    exercise does not exist. The caller commits.
+
+    Returns the new WorkoutPlan objects, in order.
+    """
+    exercise_ids = {exercise_data.get('exercise_id')
+                    for plan in plans for exercise_data in plan['selected_exercises']}
+    found = set(db.session.execute(
+        db.select(Exercises.id).where(Exercises.id.in_(exercise_ids))).scalars())
+    if found != exercise_ids:
+        raise ValueError('Exercise not found')
+
+    workout_plans = [WorkoutPlan(
+        user_id=user_id,
+        name=plan['name'],
+        frequency=plan.get('frequency'),
+        session_duration=plan.get('session_duration')
+    ) for plan in plans]
+    db.session.add_all(workout_plans)
+    db.session.flush()
+
+    rows = [{
+        'workout_plan_id': workout_plan.id,
+        'exercise_id': exercise_data['exercise_id'],
+        'sets': exercise_data.get('sets'),
+        'reps': exercise_data.get('reps'),
+        'duration': exercise_data.get('duration'),
+        'distance': exercise_data.get('distance'),
+    } for workout_plan, plan in zip(workout_plans, plans)
+        for exercise_data in plan['selected_exercises']]
+    if rows:
+        db.session.execute(db.insert(SelectedExercise), rows)
+
+    return workout_plans
+
+
 @workout_plans_ns.route('/<int:plan_id>')
 @workout_plans_ns.doc(params={"plan_id": "The ID of the workout plan"})
 class SingleWorkoutPlanResource(Resource):
@@ -156,6 +293,7 @@ class SingleWorkoutPlanResource(Resource):
     @workout_plans_ns.response(200, "Success", workout_plan_response)
     @workout_plans_ns.response(404, "Workout plan not found")
     @jwt_required()
+    @etag(user_catalog_etag)
     def get(self, plan_id):
         """
         Get a specific workout plan by its ID.
@@ -166,7 +304,7 @@ class SingleWorkoutPlanResource(Resource):
         - 200: A JSON object representing the workout plan.
         - 404: If the workout plan does not exist or does not belong to the user.
         """
-        plan = self._get_user_plan(plan_id)
+        plan = self._get_user_plan(plan_id, PLAN_DETAIL)
 
         return plan.to_dict()
 
@@ -211,7 +349,7 @@ class SingleWorkoutPlanResource(Resource):
         - 400: If there is a validation error.
         - 404: If the workout plan does not exist or does not belong to the user.
         """
-        plan = self._get_user_plan(plan_id)
+        plan = self._get_user_plan(plan_id, PLAN_DETAIL)
         data = workout_plans_ns.payload
 
         try:
@@ -221,16 +359,21 @@ class SingleWorkoutPlanResource(Resource):
                 'session_duration', plan.session_duration)
 
             db.session.commit()
+
+            plan = self._get_user_plan(plan_id, PLAN_DETAIL)
             return {'message': 'Workout plan updated successfully', 'workout_plan': plan.to_dict()}, 200
 
         except Exception as e:
             db.session.rollback()
             return {'message': str(e)}, 400
 
-    def _get_user_plan(self, plan_id):
+    def _get_user_plan(self, plan_id, shape=()):
         """
         Helper function to fetch a workout plan and verify ownership.
 
+        `shape` is a tuple of loader options from `app.shapes` describing
+        the relationships the caller is about to serialize.
+
         **Returns:**
         - The workout plan object if found.
         - Aborts with 404 if the plan does not exist or does not belong to the user.
@@ -239,7 +382,8 @@ class SingleWorkoutPlanResource(Resource):
         if not user:
             workout_plans_ns.abort(404, "User not found")
 
-        plan = WorkoutPlan.query.filter_by(id=plan_id, user_id=user.id).first()
+        plan = WorkoutPlan.query.options(*shape).filter_by(
+            id=plan_id, user_id=user.id).first()
         if not plan:
             workout_plans_ns.abort(404, "Workout plan not found")
         return plan
@@ -2,6 +2,10 @@ from flask import jsonify
 from flask_restx import Namespace, Resource, fields
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.models import WorkoutPlan, SelectedExercise, User, Exercises
+from app.shapes import SELECTED_EXERCISE_FIELDS
+from app.projection import InvalidFields, add_fields_argument
+from app.conditional import etag, user_catalog_etag
+from app.idempotency import idempotent
 from app import db
 
 
@@ -39,44 +43,63 @@ selected_exercise_model = workout_plans_exercise_ns.model('SelectedExercise', {
 })
 
 
+selected_exercise_list_parser = add_fields_argument(
+    workout_plans_exercise_ns.parser(), SELECTED_EXERCISE_FIELDS)
+
+
 @workout_plans_exercise_ns.route('/<int:plan_id>/exercises')
 class WorkoutPlanExercisesListResource(Resource):
     """
         Allows adding and fetching exercises in a workout plan.
     """
 
+    @workout_plans_exercise_ns.expect(selected_exercise_list_parser)
     @workout_plans_exercise_ns.response(200, 'Exercises retrieved successfully')
+    @workout_plans_exercise_ns.response(400, 'Unknown field')
     @workout_plans_exercise_ns.response(404, 'Workout plan not found')
     @jwt_required()
+    @etag(user_catalog_etag)
     def get(self, plan_id):
         """
         Retrieve all exercises in a specific workout plan.
 
         **Parameters:**
         - `plan_id`: The ID of the workout plan.
+        - `fields` (query): Fields to return; the nested exercise is only
+          included when `exercise` or `exercise.<field>` is requested.
 
         **Returns:**
         - 200: A list of exercises in the workout plan.
+        - 400: If `fields` names an unknown field.
         - 404: If the workout plan does not exist.
         """
         user = User.get_current_user()
         if not user:
             return {"message": "User not found"}, 404
 
-        plan = WorkoutPlan.query.filter_by(id=plan_id, user_id=user.id).first()
-        if not plan:
+        args = selected_exercise_list_parser.parse_args()
+        try:
+            selection = SELECTED_EXERCISE_FIELDS.parse(args['fields'])
+        except InvalidFields as e:
+            return {"message": str(e)}, 400
+
+        plan_exists = db.session.execute(db.select(WorkoutPlan.id).filter_by(
+            id=plan_id, user_id=user.id)).first()
+        if not plan_exists:
             return {"message": "Workout plan not found"}, 404
 
-        exercises = SelectedExercise.query.filter_by(
-            workout_plan_id=plan.id).all()
+        query = SELECTED_EXERCISE_FIELDS.select(selection).where(
+            SelectedExercise.workout_plan_id == plan_id).order_by(SelectedExercise.id)
+        exercises = SELECTED_EXERCISE_FIELDS.to_dicts(db.session.execute(query), selection)
 
-        return {"exercises": [exercise.to_dict() for exercise in exercises]}, 200
+        return {"exercises": exercises}, 200
 
     @workout_plans_exercise_ns.expect(selected_exercise_model)
     @workout_plans_exercise_ns.response(201, 'Exercise added to workout plan successfully', selected_exercise_response)
     @workout_plans_exercise_ns.response(400, 'Validation error')
     @workout_plans_exercise_ns.response(404, 'Workout plan or exercise not found')
     @jwt_required()
+    @idempotent
     def post(self, plan_id):
         """
         Add a new exercise to a workout plan.
@@ -139,6 +162,7 @@ class WorkoutPlanExerciseResource(Resource):
     @workout_plans_exercise_ns.response(200, 'Exercise retrieved successfully', selected_exercise_response)
     @workout_plans_exercise_ns.response(404, 'Workout plan or exercise not found')
     @jwt_required()
+    @etag(user_catalog_etag)
     def get(self, plan_id, id):
         """
         Retrieve details of an exercise in a specific workout plan.
@@ -1,6 +1,14 @@
 from flask_restx import Namespace, Resource, fields
 from flask_jwt_extended import jwt_required
-from app.models import WorkoutSession, User
+from sqlalchemy import and_, or_
+from app.models import WorkoutSession, WorkoutPlan, User, Exercises, SelectedExercise, SessionSet
+from app.conditional import etag, user_etag
+from app.encoding import rows_to_dicts
+from app.projection import InvalidFields, add_fields_argument
+from app.shapes import SESSION_SET_COLUMNS, WORKOUT_SESSION_FIELDS
+from app.pagination import (
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, InvalidCursor, encode_cursor, decode_cursor)
+from app.idempotency import idempotent
 from app import db
 
 
@@ -26,31 +34,103 @@ workout_session_model_response = workout_sessions_ns.model('WorkoutSessionRespon
 })
 
 
+session_set_model = workout_sessions_ns.model('SessionSet', {
+    'exercise_id': fields.Integer(description='The exercise performed; optional with selected_exercise_id'),
+    'selected_exercise_id': fields.Integer(description="The entry of the session's workout plan performed"),
+    'set_index': fields.Integer(description="1-based set number; defaults to the exercise's next set"),
+    'reps': fields.Integer(description='Repetitions'),
+    'weight': fields.Float(description='Weight lifted'),
+    'duration': fields.Integer(description='Duration of the set in seconds'),
+})
+
+session_set_response = workout_sessions_ns.inherit('SessionSetResponse', session_set_model, {
+    'id': fields.Integer(description='The unique identifier of the set'),
+})
+
+session_sets_model = workout_sessions_ns.model('SessionSets', {
+    'sets': fields.List(fields.Nested(session_set_model), required=True),
+})
+
+MAX_BULK_SETS = 1000
+
+
+workout_session_list_parser = workout_sessions_ns.parser()
+workout_session_list_parser.add_argument(
+    'limit', type=int, default=DEFAULT_PAGE_SIZE, location='args',
+    help=f'Page size (1-{MAX_PAGE_SIZE})')
+workout_session_list_parser.add_argument(
+    'cursor', type=str, location='args',
+    help='The next_cursor value returned by the previous page')
+add_fields_argument(workout_session_list_parser, WORKOUT_SESSION_FIELDS)
+
+
 @workout_sessions_ns.route("")
 class WorkoutSessionList(Resource):
     """
     Resource for retrieving and creating workout sessions.
     """
 
+    @workout_sessions_ns.expect(workout_session_list_parser)
     @workout_sessions_ns.response(200, "Success", [workout_session_model])
+    @workout_sessions_ns.response(400, "Invalid page size, cursor or field")
     @workout_sessions_ns.response(401, "Unauthorized")
     @workout_sessions_ns.response(404, "User not found")
     @jwt_required()
+    @etag(user_etag)
     def get(self):
         """
-        Get a list of completed workout sessions for the authenticated user.
+        Get a page of completed workout sessions for the authenticated user.
+
+        Sessions are returned newest first, ordered by (date, id). Pass the
+        returned `next_cursor` back as `cursor` to fetch the following page;
+        it is null on the last page. `fields` limits the columns returned.
         """
         user = User.get_current_user()
         if not user:
             return {"message": "User not found"}, 404
 
-        sessions = WorkoutSession.query.filter_by(user_id=user.id).all()
-        return {"workout_sessions": [session.to_dict() for session in sessions]}, 200
+        args = workout_session_list_parser.parse_args()
+        limit = args['limit']
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            return {"message": f"limit must be between 1 and {MAX_PAGE_SIZE}"}, 400
+        try:
+            selection = WORKOUT_SESSION_FIELDS.parse(args['fields'])
+        except InvalidFields as e:
+            return {"message": str(e)}, 400
+
+        # The trailing (date, id) columns feed the cursor.
+        query = WORKOUT_SESSION_FIELDS.select(
+            selection, WorkoutSession.date, WorkoutSession.id).where(
+            WorkoutSession.user_id == user.id)
+        if args['cursor']:
+            try:
+                date, id = decode_cursor(args['cursor'])
+            except InvalidCursor as e:
+                return {"message": str(e)}, 400
+            query = query.where(or_(
+                WorkoutSession.date < date,
+                and_(WorkoutSession.date == date, WorkoutSession.id < id)))
+
+        # Plain rows: a page is serialized straight from the columns.
+        rows = db.session.execute(query.order_by(
+            WorkoutSession.date.desc(), WorkoutSession.id.desc()).limit(limit + 1)).all()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1][-2], rows[-1][-1])
+
+        return {
+            "workout_sessions": WORKOUT_SESSION_FIELDS.to_dicts(rows, selection),
+            "next_cursor": next_cursor,
+        }, 200
 
     @workout_sessions_ns.expect(workout_session_model)
     @workout_sessions_ns.response(201, "Workout session created successfully")
     @workout_sessions_ns.response(400, "Invalid input")
+    @workout_sessions_ns.response(404, "Workout plan not found")
     @jwt_required()
+    @idempotent
     def post(self):
         """
         Create a new workout session for the authenticated user.
@@ -63,8 +143,16 @@ class WorkoutSessionList(Resource):
         if not data or "workout_plan_id" not in data or "duration" not in data:
             return {"message": "Invalid input"}, 400
 
+        plan_id = data.get('workout_plan_id')
+        if not isinstance(plan_id, int) or isinstance(plan_id, bool):
+            return {"message": "Invalid input"}, 400
+        plan_exists = db.session.execute(db.select(WorkoutPlan.id).filter_by(
+            id=plan_id, user_id=user.id)).first()
+        if not plan_exists:
+            return {"message": "Workout plan not found"}, 404
+
         new_session = WorkoutSession(
-            workout_plan_id=data.get('workout_plan_id'),
+            workout_plan_id=plan_id,
             user_id=user.id,
             duration=data.get('duration'),
             notes=data.get('notes')
@@ -78,12 +166,13 @@ class WorkoutSessionList(Resource):
 @workout_sessions_ns.route("/<int:session_id>")
 class SingleWorkoutSession(Resource):
     """
-    Resource for retrieving a single workout session
+    Resource for retrieving and deleting a single workout session
     """
 
     @workout_sessions_ns.response(200, "Success")
     @workout_sessions_ns.response(404, "Workout session not found")
     @jwt_required()
+    @etag(user_etag)
     def get(self, session_id):
         """
         Retrieve a single completed workout session by ID, including exercises.
@@ -99,3 +188,184 @@ class SingleWorkoutSession(Resource):
         return {
             "workout_session": session.to_dict(),
         }, 200
+
+    @workout_sessions_ns.response(200, "Workout session deleted successfully")
+    @workout_sessions_ns.response(401, "Unauthorized")
+    @workout_sessions_ns.response(404, "Workout session not found")
+    @jwt_required()
+    def delete(self, session_id):
+        """
+        Delete a workout session.
+        """
+        user = User.get_current_user()
+        if not user:
+            return {"message": "User not found"}, 404
+
+        session = WorkoutSession.query.filter_by(id=session_id, user_id=user.id).first()
+        if not session:
+            return {"message": "Workout session not found"}, 404
+
+        db.session.delete(session)
+        db.session.commit()
+        return {"message": "Workout session deleted successfully"}, 200
+
+
+@workout_sessions_ns.route("/<int:session_id>/sets")
+class WorkoutSessionSets(Resource):
+    """
+    Resource for logging the sets performed in a workout session.
+    """
+
+    @workout_sessions_ns.response(200, "Success", [session_set_response])
+    @workout_sessions_ns.response(401, "Unauthorized")
+    @workout_sessions_ns.response(404, "Workout session not found")
+    @jwt_required()
+    @etag(user_etag)
+    def get(self, session_id):
+        """
+        List the sets logged for a workout session, in the order they were added.
+        """
+        user = User.get_current_user()
+        if not user:
+            return {"message": "User not found"}, 404
+
+        session_exists = db.session.execute(db.select(WorkoutSession.id).filter_by(
+            id=session_id, user_id=user.id)).first()
+        if not session_exists:
+            return {"message": "Workout session not found"}, 404
+
+        sets = db.session.execute(db.select(*SESSION_SET_COLUMNS).where(
+            SessionSet.workout_session_id == session_id).order_by(SessionSet.id))
+        return {"sets": rows_to_dicts(sets)}, 200
+
+    @workout_sessions_ns.expect(session_sets_model)
+    @workout_sessions_ns.response(201, "Sets added successfully", [session_set_model])
+    @workout_sessions_ns.response(400, "Validation error")
+    @workout_sessions_ns.response(401, "Unauthorized")
+    @workout_sessions_ns.response(404, "Workout session not found")
+    @jwt_required()
+    @idempotent
+    def post(self, session_id):
+        """
+        Append sets to a workout session.
+
+        Up to 1000 sets are validated together and written with one bulk
+        INSERT, in one transaction: if any set is invalid, none are added.
+        Each set names an `exercise_id`, a `selected_exercise_id` from the
+        session's workout plan, or both. Sets without `set_index` are
+        numbered after the exercise's last set in the session.
+
+        **Returns:**
+        - 201: The added sets, with `exercise_id` and `set_index` filled in.
+        - 400: If a set is invalid or names an unknown exercise.
+        - 404: If the workout session does not exist.
+        """
+        user = User.get_current_user()
+        if not user:
+            return {"message": "User not found"}, 404
+
+        session = db.session.execute(
+            db.select(WorkoutSession.id, WorkoutSession.workout_plan_id).filter_by(
+                id=session_id, user_id=user.id)).first()
+        if not session:
+            return {"message": "Workout session not found"}, 404
+
+        data = workout_sessions_ns.payload or {}
+        entries = data.get('sets')
+        if not isinstance(entries, list) or not entries:
+            return {"message": "sets must be a non-empty list"}, 400
+        if len(entries) > MAX_BULK_SETS:
+            return {"message": f"At most {MAX_BULK_SETS} sets per request"}, 400
+
+        try:
+            sets = append_sets(session.id, session.workout_plan_id, entries)
+            # The bulk INSERT skips the flush hooks that version user data.
+            User.bump_data_version(db.session.connection(), [user.id])
+            db.session.commit()
+        except ValueError as e:
+            db.session.rollback()
+            return {"message": str(e)}, 400
+
+        return {"message": "Sets added successfully", "sets": sets}, 201
+
+
+SET_FIELDS = ('exercise_id', 'selected_exercise_id', 'set_index', 'reps', 'weight', 'duration')
+# Optional integer fields of a set, with their smallest valid value.
+SET_INTEGER_FIELDS = {'set_index': 1, 'reps': 0, 'duration': 0}
+
+
+def _validate_set(entry):
+    """Return a copy of `entry` with only the known fields, or raise ValueError."""
+    if not isinstance(entry, dict):
+        raise ValueError('Each set must be an object')
+    for field in ('exercise_id', 'selected_exercise_id'):
+        value = entry.get(field)
+        if value is not None and (not isinstance(value, int) or isinstance(value, bool)):
+            raise ValueError(f'{field} must be an integer')
+    if entry.get('exercise_id') is None and entry.get('selected_exercise_id') is None:
+        raise ValueError('Each set needs an exercise_id or a selected_exercise_id')
+    for field, minimum in SET_INTEGER_FIELDS.items():
+        value = entry.get(field)
+        if value is not None and (not isinstance(value, int) or isinstance(value, bool)
+                                  or value < minimum):
+            raise ValueError(f'{field} must be an integer of at least {minimum}')
+    weight = entry.get('weight')
+    if weight is not None and (not isinstance(weight, (int, float)) or isinstance(weight, bool)
+                               or weight < 0):
+        raise ValueError('weight must be a non-negative number')
+    return {field: entry.get(field) for field in SET_FIELDS}
+
+
+def append_sets(session_id, workout_plan_id, entries):
+    """
+    Insert sets for a workout session.
+
+    Exercise and plan entry ids across `entries` are checked with one IN
+    query each, next set numbers come from one GROUP BY, and all rows are
+    written with a single executemany INSERT, so the number of statements
+    does not depend on how many sets are sent. Raises ValueError if a set
+    is invalid. The caller commits.
+
+    Returns the inserted sets as dicts, in order, with `exercise_id` and
+    `set_index` filled in.
+    """
+    sets = [_validate_set(entry) for entry in entries]
+
+    selected_ids = {s['selected_exercise_id'] for s in sets} - {None}
+    if selected_ids:
+        selected = dict(db.session.execute(
+            db.select(SelectedExercise.id, SelectedExercise.exercise_id).where(
+                SelectedExercise.id.in_(selected_ids),
+                SelectedExercise.workout_plan_id == workout_plan_id)).all())
+        if len(selected) != len(selected_ids):
+            raise ValueError("Selected exercise not found in this session's workout plan")
+        for s in sets:
+            if s['selected_exercise_id'] is not None:
+                exercise_id = selected[s['selected_exercise_id']]
+                if s['exercise_id'] not in (None, exercise_id):
+                    raise ValueError('exercise_id does not match the selected exercise')
+                s['exercise_id'] = exercise_id
+
+    exercise_ids = {s['exercise_id'] for s in sets}
+    found = set(db.session.execute(
+        db.select(Exercises.id).where(Exercises.id.in_(exercise_ids))).scalars())
+    if found != exercise_ids:
+        raise ValueError('Exercise not found')
+
+    if any(s['set_index'] is None for s in sets):
+        last_index = dict(db.session.execute(
+            db.select(SessionSet.exercise_id, db.func.max(SessionSet.set_index))
+            .where(SessionSet.workout_session_id == session_id,
+                   SessionSet.exercise_id.in_(exercise_ids))
+            .group_by(SessionSet.exercise_id)).all())
+        for s in sets:
+            if s['set_index'] is None:
+                s['set_index'] = last_index.get(s['exercise_id'], 0) + 1
+            last_index[s['exercise_id']] = max(last_index.get(s['exercise_id'], 0),
+                                               s['set_index'])
+
+    # Plain executemany: asking for ordered RETURNING ids would make
+    # SQLite send one INSERT per row.
+    db.session.execute(db.insert(SessionSet), [
+        {'workout_session_id': session_id, **s} for s in sets])
+    return sets
@@ -0,0 +1,184 @@
+"""
+In-memory search over the exercise catalog.
+
+``ExerciseIndex`` is an inverted index of the words in each exercise's
+name and description, plus postings for every target muscle and
+difficulty. Queries match words by prefix and every query word must
+match; exercises whose *name* matches all words rank first. Facet counts
+for muscles and difficulty are returned with every result.
+
+The index is built from the database on first use and rebuilt whenever
+the catalog version (see ``app.catalog``) changes.
+"""
+import re
+import threading
+from bisect import bisect_left
+
+from app import db
+from app.catalog import catalog_cache
+from app.models import Exercises, split_muscles
+
+
+_WORD = re.compile(r'\w+')
+
+
+def tokenize(text):
+    return _WORD.findall(text.lower()) if text else []
+
+
+class ExerciseIndex:
+    """
+    Postings are stored as bitsets (Python ints): bit ``i`` is set when the
+    ``i``-th exercise in name order matches, so AND/OR and counting are
+    word-parallel and the lowest set bits are the first results. Rare words
+    keep a tuple of positions instead, since a bitset costs memory in
+    proportion to the catalog size.
+    """
+
+    def __init__(self, exercises):
+        """Build the index from an iterable of ``Exercises.to_dict()`` dicts."""
+        self.exercises = sorted(exercises, key=lambda e: (e['name'].lower(), e['id']))
+        size = len(self.exercises)
+        self._all = (1 << size) - 1
+
+        name_words = {}
+        words = {}
+        muscles = {}
+        self._muscle_names = {}
+        difficulty = {}
+        for position, exercise in enumerate(self.exercises):
+            name_tokens = set(tokenize(exercise['name']))
+            for word in name_tokens:
+                name_words.setdefault(word, []).append(position)
+            for word in name_tokens.union(tokenize(exercise['description'])):
+                words.setdefault(word, []).append(position)
+            for muscle in split_muscles(exercise['target_muscles']):
+                key = muscle.lower()
+                self._muscle_names.setdefault(key, muscle)
+                muscles.setdefault(key, []).append(position)
+            difficulty.setdefault(exercise['difficulty'], []).append(position)
+
+        self._size = size
+        self._name_words = _postings(name_words, size)
+        self._words = _postings(words, size)
+        self._muscles = {key: _to_bits(p, size) for key, p in muscles.items()}
+        self._difficulty = {key: _to_bits(p, size) for key, p in difficulty.items()}
+        self._sorted_words = sorted(self._words)
+        self._sorted_name_words = sorted(self._name_words)
+        # Facet counts for the unfiltered catalog, the most common request.
+        self._all_facets = self._facets(self._all, self._all)
+
+    def search(self, q=None, muscles=(), difficulty=None, limit=20):
+        """
+        Return ``(total, exercises, facets)`` for the given query and filters.
+
+        Muscle facet counts ignore the muscle filter and difficulty facet
+        counts ignore the difficulty filter, so clients can show how many
+        results each alternative value would give.
+        """
+        words = tokenize(q)
+        matched = self._match(words, self._words, self._sorted_words) if words else self._all
+
+        muscle_bits = self._all
+        if muscles:
+            muscle_bits = 0
+            for muscle in muscles:
+                muscle_bits |= self._muscles.get(muscle.strip().lower(), 0)
+        difficulty_bits = (self._difficulty.get(difficulty, 0)
+                           if difficulty is not None else self._all)
+
+        for_muscles = matched & difficulty_bits
+        for_difficulty = matched & muscle_bits
+        results = for_muscles & muscle_bits
+
+        if for_muscles == self._all and for_difficulty == self._all:
+            facets = self._all_facets
+        else:
+            facets = self._facets(for_muscles, for_difficulty)
+
+        if words:
+            name_matches = self._match(words, self._name_words, self._sorted_name_words)
+            top = _lowest(results & name_matches, limit)
+            top += _lowest(results & ~name_matches, limit - len(top))
+        else:
+            top = _lowest(results, limit)
+
+        return results.bit_count(), [self.exercises[i] for i in top], facets
+
+    def _match(self, words, postings, sorted_words):
+        """Bitset of exercises with a word starting with each of `words`."""
+        result = self._all
+        for word in sorted(set(words), key=len, reverse=True):
+            start = bisect_left(sorted_words, word)
+            bits = 0
+            positions = []
+            for token in sorted_words[start:]:
+                if not token.startswith(word):
+                    break
+                posting = postings[token]
+                if isinstance(posting, int):
+                    bits |= posting
+                else:
+                    positions.extend(posting)
+            if positions:
+                bits |= _to_bits(positions, self._size)
+            result &= bits
+            if not result:
+                break
+        return result
+
+    def _facets(self, for_muscles, for_difficulty):
+        muscles = {}
+        for key, bits in self._muscles.items():
+            count = (bits & for_muscles).bit_count()
+            if count:
+                muscles[self._muscle_names[key]] = count
+        difficulty = {}
+        for level, bits in sorted(self._difficulty.items(), key=lambda item: str(item[0])):
+            count = (bits & for_difficulty).bit_count()
+            if count:
+                difficulty[str(level)] = count
+        return {'muscles': muscles, 'difficulty': difficulty}
+
+
+def _postings(postings, size):
+    """Turn ``{key: [positions]}`` into bitsets, or tuples for rare keys."""
+    dense = max(1, size // 256)
+    return {key: _to_bits(positions, size) if len(positions) >= dense else tuple(positions)
+            for key, positions in postings.items()}
+
+
+def _to_bits(positions, size):
+    buffer = bytearray((size + 7) // 8)
+    for position in positions:
+        buffer[position >> 3] |= 1 << (position & 7)
+    return int.from_bytes(buffer, 'little')
+
+
+def _lowest(bits, count):
+    """Positions of the `count` lowest set bits."""
+    positions = []
+    while bits and len(positions) < count:
+        low = bits & -bits
+        positions.append(low.bit_length() - 1)
+        bits ^= low
+    return positions
+
+
+_lock = threading.Lock()
+_index = None
+_index_version = None
+
+
+def get_index():
+    """Return the index for the current catalog version, rebuilding if stale."""
+    global _index, _index_version
+    version = catalog_cache.version()
+    if _index is not None and _index_version == version:
+        return _index
+    with _lock:
+        if _index is None or _index_version != version:
+            rows = db.session.execute(db.select(Exercises)).scalars()
+            _index = ExerciseIndex(exercise.to_dict() for exercise in rows)
+            _index_version = version
+    return _index
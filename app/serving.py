@@ -0,0 +1,99 @@
+"""
+Production serving via gunicorn.
+
+``flask --app app:create_app serve`` runs the API under gunicorn with a
+pre-forked pool of worker processes, each running a pool of threads
+(the ``gthread`` worker). Every option can also be set through the
+environment, so containers only need to set variables:
+
+- ``WEB_BIND`` (``0.0.0.0:5000``)
+- ``WEB_WORKERS`` (``2 * CPUs + 1``)
+- ``WEB_THREADS`` (``4``)
+- ``WEB_KEEPALIVE`` seconds to hold idle keep-alive connections (``5``)
+- ``WEB_TIMEOUT`` seconds before a silent worker is restarted (``30``)
+- ``WEB_GRACEFUL_TIMEOUT`` seconds workers get to finish on reload/stop (``30``)
+- ``WEB_MAX_REQUESTS`` requests before a worker is recycled, 0 = never (``0``)
+- ``WEB_PRELOAD`` build the app once in the master before forking (``1``)
+
+Send ``SIGHUP`` to the master for a graceful reload: new workers are
+started while the old ones finish their in-flight requests. With the
+default ``--preload`` the new workers are forked from the app the master
+built at startup, so code and environment changes need a full restart.
+Under ``--no-preload`` each worker builds the app itself and a reload
+picks up new code, though the master's environment is unchanged.
+"""
+import os
+
+import click
+
+
+def _default_workers():
+    return 2 * (os.cpu_count() or 1) + 1
+
+
+def serve(app_factory, bind, workers, threads, keepalive, timeout,
+          graceful_timeout, max_requests, preload):
+    # Imported here so the rest of the app does not require gunicorn.
+    from gunicorn.app.base import BaseApplication
+
+    from app import db
+
+    class Application(BaseApplication):
+        def __init__(self, options):
+            self.options = options
+            self.application = None
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            if self.application is None:
+                self.application = app_factory()
+            return self.application
+
+    def post_fork(server, worker):
+        # Never share pooled connections opened in the master with children.
+        app = server.app.application
+        if app is not None:
+            with app.app_context():
+                db.engine.dispose(close=False)
+
+    Application({
+        'bind': bind,
+        'workers': workers,
+        'threads': threads,
+        'worker_class': 'gthread' if threads > 1 else 'sync',
+        'keepalive': keepalive,
+        'timeout': timeout,
+        'graceful_timeout': graceful_timeout,
+        'max_requests': max_requests,
+        # Spread recycling so workers do not all restart at once.
+        'max_requests_jitter': max_requests // 10,
+        'preload_app': preload,
+        'post_fork': post_fork,
+        'accesslog': '-',
+    }).run()
+
+
+@click.command('serve')
+@click.option('--bind', envvar='WEB_BIND', default='0.0.0.0:5000', show_default=True)
+@click.option('--workers', envvar='WEB_WORKERS', type=int, default=_default_workers,
+              help='Worker processes  [default: 2 * CPUs + 1]')
+@click.option('--threads', envvar='WEB_THREADS', type=int, default=4, show_default=True,
+              help='Threads per worker process')
+@click.option('--keepalive', envvar='WEB_KEEPALIVE', type=int, default=5, show_default=True,
+              help='Seconds to hold idle keep-alive connections')
+@click.option('--timeout', envvar='WEB_TIMEOUT', type=int, default=30, show_default=True,
+              help='Seconds before a silent worker is restarted')
+@click.option('--graceful-timeout', envvar='WEB_GRACEFUL_TIMEOUT', type=int, default=30,
+              show_default=True, help='Seconds workers get to finish on reload or stop')
+@click.option('--max-requests', envvar='WEB_MAX_REQUESTS', type=int, default=0,
+              show_default=True, help='Recycle workers after this many requests (0 = never)')
+@click.option('--preload/--no-preload', envvar='WEB_PRELOAD', default=True, show_default=True,
+              help='Build the app once in the master process before forking')
+def serve_command(**options):
+    """Serve the API with gunicorn (production)."""
+    from app import create_app
+    serve(create_app, **options)
@@ -0,0 +1,96 @@
+"""
+Query shapes for the API's read paths.
+
+Each shape is a tuple of SQLAlchemy loader options describing which
+relationships a serializer walks, so endpoints can load everything
+``to_dict()`` touches in a fixed number of queries instead of lazily
+fetching one related row at a time.
+
+Usage::
+
+    WorkoutPlan.query.options(*PLAN_DETAIL).filter_by(id=plan_id).first()
+
+List endpoints select columns rather than ORM objects. The ``*_COLUMNS``
+tuples are the columns ``to_dict()`` reads, and the ``*_FIELDS``
+projections (see ``app.projection``) describe what each list can return
+for ``?fields=``, with defaults matching ``to_dict()``::
+
+    selection = WORKOUT_SESSION_FIELDS.parse(request.args.get('fields'))
+    WORKOUT_SESSION_FIELDS.select(selection).where(...)
+"""
+from sqlalchemy.orm import selectinload
+from app.projection import Nested, Projection
+from app.models import (
+    Exercises, WorkoutPlan, SelectedExercise, ExerciseGoal, WorkoutSession, SessionSet)
+
+
+# WorkoutPlan.to_dict(): plan -> selected_exercises -> exercise
+# One query for the plan, one SELECT ... IN for its exercises (joined to
+# the exercise catalog), regardless of how many exercises the plan has.
+PLAN_DETAIL = (
+    selectinload(WorkoutPlan.selected_exercises)
+    .joinedload(SelectedExercise.exercise),
+)
+
+# Exercises.to_dict()
+EXERCISE_COLUMNS = (
+    Exercises.id,
+    Exercises.name,
+    Exercises.description,
+    Exercises.instructions,
+    Exercises.target_muscles,
+    Exercises.difficulty,
+)
+
+# WorkoutSession.to_dict(); `date` is left to the response encoder
+WORKOUT_SESSION_COLUMNS = (
+    WorkoutSession.id,
+    WorkoutSession.workout_plan_id,
+    WorkoutSession.user_id,
+    WorkoutSession.date,
+    WorkoutSession.duration,
+    WorkoutSession.notes,
+)
+
+# SessionSet.to_dict()
+SESSION_SET_COLUMNS = (
+    SessionSet.id,
+    SessionSet.exercise_id,
+    SessionSet.selected_exercise_id,
+    SessionSet.set_index,
+    SessionSet.reps,
+    SessionSet.weight,
+    SessionSet.duration,
+)
+
+
+# ?fields= projections for list endpoints
+
+EXERCISE_FIELDS = Projection(EXERCISE_COLUMNS)
+
+WORKOUT_SESSION_FIELDS = Projection(WORKOUT_SESSION_COLUMNS)
+
+WORKOUT_PLAN_SUMMARY_FIELDS = Projection(
+    (WorkoutPlan.id, WorkoutPlan.name, WorkoutPlan.frequency, WorkoutPlan.session_duration),
+    extra=(WorkoutPlan.user_id,),
+)
+
+SELECTED_EXERCISE_FIELDS = Projection(
+    (SelectedExercise.id,
+     Nested('exercise', EXERCISE_FIELDS, SelectedExercise.exercise_id),
+     SelectedExercise.sets,
+     SelectedExercise.reps,
+     SelectedExercise.duration,
+     SelectedExercise.distance),
+    extra=(SelectedExercise.exercise_id, SelectedExercise.workout_plan_id),
+)
+
+EXERCISE_GOAL_FIELDS = Projection(
+    (ExerciseGoal.id,
+     Nested('exercise', EXERCISE_FIELDS, ExerciseGoal.exercise_id),
+     ExerciseGoal.target_sets,
+     ExerciseGoal.target_reps,
+     ExerciseGoal.target_duration,
+     ExerciseGoal.target_distance),
+    extra=(ExerciseGoal.exercise_id,),
+)
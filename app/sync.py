@@ -0,0 +1,204 @@
+"""
+Delta sync for offline-capable clients.
+
+Synced tables carry an ``updated_at`` timestamp, indexed per user, and
+deletes leave a row in ``sync_tombstones``. ``GET /api/sync`` returns the
+rows changed since the client's token and the ids deleted since then,
+streamed table by table, plus the token for the next sync.
+
+Tokens are timestamps taken when a sync starts, minus
+``SYNC_OVERLAP_SECONDS``: a transaction that stamped its rows just before
+the sync but committed after it is picked up next time, at the cost of
+re-sending the last few changes. Clients apply rows as upserts, so
+duplicates are harmless.
+
+Tombstones are kept for ``SYNC_TOMBSTONE_DAYS``; older tokens are
+rejected and the client has to sync from scratch. ``flask sync prune``
+deletes expired tombstones.
+
+Writes that bypass the ORM get ``updated_at`` from its column default,
+but their deletes leave no tombstone.
+"""
+import base64
+import binascii
+import os
+from datetime import datetime, timedelta, timezone
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+
+from app import db
+from app.encoding import response_encoder
+from app.models import (User, WorkoutPlan, SelectedExercise, ExerciseGoal, WorkoutSession,
+                        FitnessGoal, SyncTombstone)
+
+
+# name -> columns returned for changed rows, in response order
+SYNCED_COLUMNS = {
+    'workout_plans': (
+        WorkoutPlan.id, WorkoutPlan.name, WorkoutPlan.frequency,
+        WorkoutPlan.session_duration, WorkoutPlan.updated_at),
+    'selected_exercises': (
+        SelectedExercise.id, SelectedExercise.workout_plan_id, SelectedExercise.exercise_id,
+        SelectedExercise.sets, SelectedExercise.reps, SelectedExercise.duration,
+        SelectedExercise.distance, SelectedExercise.updated_at),
+    'exercise_goals': (
+        ExerciseGoal.id, ExerciseGoal.exercise_id, ExerciseGoal.target_sets,
+        ExerciseGoal.target_reps, ExerciseGoal.target_duration, ExerciseGoal.target_distance,
+        ExerciseGoal.updated_at),
+    'workout_sessions': (
+        WorkoutSession.id, WorkoutSession.workout_plan_id, WorkoutSession.date,
+        WorkoutSession.duration, WorkoutSession.notes, WorkoutSession.updated_at),
+    'fitness_goals': (
+        FitnessGoal.id, FitnessGoal.target_weight, FitnessGoal.target_muscle_mass,
+        FitnessGoal.target_body_fat_percentage, FitnessGoal.updated_at),
+}
+
+SYNCED_MODELS = (WorkoutPlan, SelectedExercise, ExerciseGoal, WorkoutSession, FitnessGoal)
+
+# Rows fetched and encoded at a time while streaming
+STREAM_BATCH_SIZE = 500
+
+
+class InvalidToken(ValueError):
+    pass
+
+
+class ExpiredToken(ValueError):
+    pass
+
+
+def encode_token(moment):
+    return base64.urlsafe_b64encode(moment.isoformat().encode('ascii')).decode('ascii').rstrip('=')
+
+
+def decode_token(token):
+    """Return the timestamp encoded in `token`, as naive UTC."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        moment = datetime.fromisoformat(
+            base64.urlsafe_b64decode(padded.encode('ascii')).decode('ascii'))
+    except (binascii.Error, UnicodeError, ValueError):
+        raise InvalidToken('Invalid sync token')
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+
+def _changed_rows(name, user_id, since):
+    columns = SYNCED_COLUMNS[name]
+    model = columns[0].class_
+    query = select(*columns)
+    if model is SelectedExercise:
+        # Reached through the user's plans, (workout_plan_id, updated_at) index
+        query = query.join(WorkoutPlan).where(WorkoutPlan.user_id == user_id)
+    else:
+        query = query.where(model.user_id == user_id)
+    if since is not None:
+        query = query.where(model.updated_at >= since)
+    return query.order_by(model.updated_at, model.id)
+
+
+def stream_changes(user_id, token=None):
+    """
+    Check `token` and return a generator of the JSON body of a sync
+    response: ``{"next": token, "full": bool, "changes": {table: [row,
+    ...]}, "deleted": {table: [id, ...]}}``. Raises InvalidToken or
+    ExpiredToken for a bad `token`.
+    """
+    now = datetime.utcnow()
+    since = decode_token(token) if token else None
+    if since is not None and since < now - timedelta(
+            days=current_app.config['SYNC_TOMBSTONE_DAYS']):
+        raise ExpiredToken('Sync token expired; sync again without one')
+    next_token = encode_token(now - timedelta(seconds=current_app.config['SYNC_OVERLAP_SECONDS']))
+    dumps = response_encoder.dumps
+
+    def rows(query):
+        """Yield comma-separated encoded dicts, a batch at a time."""
+        result = db.session.execute(query.execution_options(yield_per=STREAM_BATCH_SIZE))
+        keys = list(result.keys())
+        separator = b''
+        for partition in result.partitions():
+            # Encode the batch as a list and drop the brackets
+            yield separator + dumps([dict(zip(keys, row)) for row in partition])[1:-1]
+            separator = b','
+
+    def generate():
+        yield b'{"next":' + dumps(next_token) + b',"full":' + dumps(since is None)
+        yield b',"changes":{'
+        for index, name in enumerate(SYNCED_COLUMNS):
+            yield (b',' if index else b'') + dumps(name) + b':['
+            yield from rows(_changed_rows(name, user_id, since))
+            yield b']'
+        yield b'},"deleted":{'
+        if since is not None:
+            deleted = {}
+            for table_name, row_id in db.session.execute(
+                    select(SyncTombstone.table_name, SyncTombstone.row_id)
+                    .where(SyncTombstone.user_id == user_id, SyncTombstone.deleted_at >= since)
+                    .order_by(SyncTombstone.id)):
+                deleted.setdefault(table_name, []).append(row_id)
+            yield dumps(deleted)[1:-1]
+        yield b'}}'
+
+    return generate()
+
+
+@event.listens_for(Session, 'after_flush')
+def _record_tombstones(session, flush_context):
+    deleted = [obj for obj in session.deleted if isinstance(obj, SYNCED_MODELS)]
+    # A deleted account has nobody left to sync.
+    deleted_users = {inspect(obj).identity[0] for obj in session.deleted
+                     if isinstance(obj, User)}
+    if not deleted and not deleted_users:
+        return
+    connection = session.connection()
+    if deleted_users:
+        connection.execute(db.delete(SyncTombstone).where(
+            SyncTombstone.user_id.in_(deleted_users)))
+
+    # Selected exercises belong to a user through their plan, which may
+    # have been deleted in this flush too.
+    plan_owners = {inspect(obj).identity[0]: inspect(obj).dict.get('user_id')
+                   for obj in deleted if isinstance(obj, WorkoutPlan)}
+    missing = {inspect(obj).dict.get('workout_plan_id') for obj in deleted
+               if isinstance(obj, SelectedExercise)} - plan_owners.keys() - {None}
+    if missing:
+        plan_owners.update(connection.execute(
+            select(WorkoutPlan.id, WorkoutPlan.user_id).where(WorkoutPlan.id.in_(missing))).all())
+
+    now = datetime.utcnow()
+    rows = []
+    for obj in deleted:
+        state = inspect(obj)
+        if isinstance(obj, SelectedExercise):
+            user_id = plan_owners.get(state.dict.get('workout_plan_id'))
+        else:
+            user_id = state.dict.get('user_id')
+        if user_id is not None and user_id not in deleted_users:
+            rows.append({'user_id': user_id, 'table_name': obj.__tablename__,
+                         'row_id': state.identity[0], 'deleted_at': now})
+    if rows:
+        connection.execute(db.insert(SyncTombstone), rows)
+
+
+sync_command = AppGroup('sync', help='Maintain delta sync state.')
+
+
+@sync_command.command('prune')
+def prune_command():
+    """Delete tombstones older than SYNC_TOMBSTONE_DAYS."""
+    cutoff = datetime.utcnow() - timedelta(days=current_app.config['SYNC_TOMBSTONE_DAYS'])
+    result = db.session.execute(db.delete(SyncTombstone).where(SyncTombstone.deleted_at < cutoff))
+    db.session.commit()
+    click.echo(f'Deleted {result.rowcount} tombstones.')
+
+
+def init_sync(app):
+    app.config.setdefault('SYNC_OVERLAP_SECONDS', int(os.getenv('SYNC_OVERLAP_SECONDS', 60)))
+    app.config.setdefault('SYNC_TOMBSTONE_DAYS', int(os.getenv('SYNC_TOMBSTONE_DAYS', 90)))
+    app.cli.add_command(sync_command)
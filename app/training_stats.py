@@ -0,0 +1,291 @@
+"""
+Lifetime training totals kept in ``user_training_stats`` and
+``plan_training_stats``, so dashboards read a row instead of scanning
+``workout_sessions``.
+
+Sessions inserted or deleted through the ORM update the rows in the same
+flush: counts and durations are applied as deltas, and appending a
+session moves the streak forward without reading any history. Changes
+that could join or split a streak earlier on (deleting a session in the
+current streak, backdating one right before it, editing a session)
+recompute that user's rows from ``workout_sessions`` instead.
+
+Bulk writers that bypass the ORM unit of work must call ``rebuild()``
+themselves; ``flask training-stats rebuild`` backfills all users and
+``flask training-stats check`` reports rows that disagree with the
+sessions table.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import event, func, inspect, literal, select
+from sqlalchemy.orm import Session, object_session
+
+from app import db
+from app.analytics import day_number
+from app.models import PlanTrainingStats, UserTrainingStats, WorkoutPlan, WorkoutSession
+
+
+def _user_stats_query(user_ids=None):
+    """SELECT the UserTrainingStats columns computed from workout_sessions."""
+    where = [] if user_ids is None else [WorkoutSession.user_id.in_(user_ids)]
+    totals = (
+        select(WorkoutSession.user_id,
+               func.count().label('sessions'),
+               func.coalesce(func.sum(WorkoutSession.duration), 0).label('total_duration'),
+               func.max(WorkoutSession.date).label('last_session'))
+        .where(*where)
+        .group_by(WorkoutSession.user_id)
+        .subquery())
+
+    # Gaps and islands: day - row_number is constant within a run of
+    # consecutive days, and the last run's value is last day - day count.
+    days = select(WorkoutSession.user_id, day_number(WorkoutSession.date).label('day')).where(
+        *where).distinct().subquery()
+    by_user = {'partition_by': days.c.user_id}
+    numbered = select(
+        days.c.user_id,
+        (days.c.day - func.row_number().over(order_by=days.c.day, **by_user)).label('run'),
+        (func.max(days.c.day).over(**by_user) - func.count().over(**by_user)).label('last_run'),
+    ).subquery()
+    streaks = (
+        select(numbered.c.user_id, func.count().label('streak'))
+        .where(numbered.c.run == numbered.c.last_run)
+        .group_by(numbered.c.user_id)
+        .subquery())
+
+    return (
+        select(totals.c.user_id, totals.c.sessions, totals.c.total_duration,
+               totals.c.last_session, streaks.c.streak)
+        .join(streaks, streaks.c.user_id == totals.c.user_id))
+
+
+def _plan_stats_query(user_ids=None):
+    """
+    SELECT the PlanTrainingStats columns computed from workout_sessions.
+
+    Only sessions logged against the user's own plans count: older rows
+    may point at another user's plan, and a plan has one stats row.
+    """
+    where = [] if user_ids is None else [WorkoutSession.user_id.in_(user_ids)]
+    return (
+        select(WorkoutSession.workout_plan_id, WorkoutSession.user_id,
+               func.count().label('sessions'),
+               func.coalesce(func.sum(WorkoutSession.duration), 0).label('total_duration'))
+        .join(WorkoutPlan, (WorkoutPlan.id == WorkoutSession.workout_plan_id)
+              & (WorkoutPlan.user_id == WorkoutSession.user_id))
+        .where(*where)
+        .group_by(WorkoutSession.workout_plan_id, WorkoutSession.user_id))
+
+
+def rebuild(connection, user_ids=None):
+    """Recompute the stats rows of `user_ids` (all users if None) from workout_sessions."""
+    for model, query in ((UserTrainingStats, _user_stats_query(user_ids)),
+                         (PlanTrainingStats, _plan_stats_query(user_ids))):
+        table = model.__table__
+        delete = db.delete(table)
+        if user_ids is not None:
+            delete = delete.where(table.c.user_id.in_(user_ids))
+        connection.execute(delete)
+        connection.execute(db.insert(table).from_select(
+            [column.name for column in query.selected_columns], query))
+
+
+def check(connection):
+    """
+    Compare the stored rows with workout_sessions and return a list of
+    ``(table, key, stored, expected)`` for every row that differs.
+    """
+    mismatches = []
+    for model, key, query in (
+            (UserTrainingStats, 'user_id', _user_stats_query()),
+            (PlanTrainingStats, 'workout_plan_id', _plan_stats_query())):
+        columns = [column.name for column in query.selected_columns]
+        stored = {row[key]: row for row in connection.execute(
+            select(*(model.__table__.c[name] for name in columns))).mappings()}
+        expected = {row[key]: row for row in connection.execute(query).mappings()}
+        for id in sorted(stored.keys() | expected.keys()):
+            if stored.get(id) != expected.get(id):
+                mismatches.append((model.__tablename__, id,
+                                   dict(stored[id]) if id in stored else None,
+                                   dict(expected[id]) if id in expected else None))
+    return mismatches
+
+
+def summary(user_id, today=None):
+    """A user's lifetime totals and per-plan counts, read from the stats tables."""
+    today = today or datetime.utcnow().date()
+    row = db.session.execute(
+        select(UserTrainingStats).where(UserTrainingStats.user_id == user_id)).scalar()
+    if row is None:
+        return {'sessions': 0, 'total_duration': 0, 'last_session': None,
+                'current_streak': 0, 'plans': []}
+
+    plans = db.session.execute(
+        select(PlanTrainingStats.workout_plan_id, WorkoutPlan.name,
+               PlanTrainingStats.sessions, PlanTrainingStats.total_duration)
+        .join(WorkoutPlan, WorkoutPlan.id == PlanTrainingStats.workout_plan_id)
+        .where(PlanTrainingStats.user_id == user_id)
+        .order_by(PlanTrainingStats.sessions.desc(), PlanTrainingStats.workout_plan_id))
+    # The stored streak ends on the last session's day; it is only
+    # current if that was today or yesterday.
+    is_current = row.last_session.date() >= today - timedelta(days=1)
+    return {
+        'sessions': row.sessions,
+        'total_duration': row.total_duration,
+        'last_session': row.last_session,
+        'current_streak': row.streak if is_current else 0,
+        'plans': [dict(plan._mapping) for plan in plans],
+    }
+
+
+class _Changes:
+    """Session writes for one user collected during a flush."""
+
+    def __init__(self):
+        self.sessions = 0
+        self.total_duration = 0
+        self.plans = defaultdict(lambda: [0, 0])
+        self.added = []
+        self.removed = []
+        self.refresh = False
+
+    def count(self, session, sign):
+        self.sessions += sign
+        self.total_duration += sign * session.duration
+        plan = self.plans[session.workout_plan_id]
+        plan[0] += sign
+        plan[1] += sign * session.duration
+        (self.added if sign > 0 else self.removed).append(session.date)
+
+
+def _changes(target, user_id):
+    pending = object_session(target).info.setdefault('training_stats', {})
+    if user_id not in pending:
+        pending[user_id] = _Changes()
+    return pending[user_id]
+
+
+@event.listens_for(WorkoutSession, 'after_insert')
+def _count_insert(mapper, connection, target):
+    _changes(target, target.user_id).count(target, 1)
+
+
+@event.listens_for(WorkoutSession, 'before_delete')
+def _count_delete(mapper, connection, target):
+    _changes(target, target.user_id).count(target, -1)
+
+
+@event.listens_for(WorkoutSession, 'after_update')
+def _count_update(mapper, connection, target):
+    attrs = inspect(target).attrs
+    if any(attrs[name].history.has_changes()
+           for name in ('user_id', 'workout_plan_id', 'date', 'duration')):
+        for user_id in {target.user_id, *attrs.user_id.history.deleted}:
+            _changes(target, user_id).refresh = True
+
+
+def _extend(last_session, streak, added):
+    """
+    Return ``(last_session, streak)`` after adding sessions dated `added`,
+    or None if one could join the current streak to an earlier one.
+    """
+    run_start = last_session.date() - timedelta(days=streak - 1)
+    for moment in sorted(added):
+        day, last_day = moment.date(), last_session.date()
+        if day > last_day:
+            streak = streak + 1 if day == last_day + timedelta(days=1) else 1
+            run_start = day - timedelta(days=streak - 1)
+            last_session = moment
+        elif day == last_day:
+            last_session = max(last_session, moment)
+        elif day == run_start - timedelta(days=1):
+            return None
+    return last_session, streak
+
+
+def _apply(connection, user_id, changes):
+    """Apply `changes` to the user's rows; return False if they must be rebuilt."""
+    users, plans = UserTrainingStats.__table__, PlanTrainingStats.__table__
+    row = connection.execute(
+        select(users.c.last_session, users.c.streak)
+        .where(users.c.user_id == user_id).with_for_update()).first()
+    if row is None or changes.refresh:
+        return False
+
+    last_session, streak = row
+    run_start = last_session.date() - timedelta(days=streak - 1)
+    if any(moment.date() >= run_start for moment in changes.removed):
+        return False
+    extended = _extend(last_session, streak, changes.added)
+    if extended is None:
+        return False
+    last_session, streak = extended
+
+    connection.execute(
+        db.update(users).where(users.c.user_id == user_id).values(
+            sessions=users.c.sessions + changes.sessions,
+            total_duration=users.c.total_duration + changes.total_duration,
+            last_session=last_session, streak=streak))
+    for plan_id, (sessions, total_duration) in changes.plans.items():
+        result = connection.execute(
+            db.update(plans).where(
+                plans.c.workout_plan_id == plan_id, plans.c.user_id == user_id).values(
+                sessions=plans.c.sessions + sessions,
+                total_duration=plans.c.total_duration + total_duration))
+        if result.rowcount == 0 and sessions > 0:
+            # Only for the user's own plan, as in _plan_stats_query
+            connection.execute(db.insert(plans).from_select(
+                ['workout_plan_id', 'user_id', 'sessions', 'total_duration'],
+                select(WorkoutPlan.id, WorkoutPlan.user_id,
+                       literal(sessions), literal(total_duration))
+                .where(WorkoutPlan.id == plan_id, WorkoutPlan.user_id == user_id)))
+
+    for table in (users, plans):
+        connection.execute(db.delete(table).where(
+            table.c.user_id == user_id, table.c.sessions <= 0))
+    return True
+
+
+@event.listens_for(Session, 'after_flush')
+def _update_training_stats(session, flush_context):
+    pending = session.info.pop('training_stats', None)
+    if not pending:
+        return
+    connection = session.connection()
+    stale = [user_id for user_id, changes in pending.items()
+             if not _apply(connection, user_id, changes)]
+    if stale:
+        rebuild(connection, stale)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_on_rollback(session):
+    session.info.pop('training_stats', None)
+
+
+stats_command = AppGroup('training-stats', help='Maintain the training summary tables.')
+
+
+@stats_command.command('rebuild')
+@click.option('--user', 'user_ids', type=int, multiple=True,
+              help='Only rebuild these users (repeatable)  [default: all]')
+def rebuild_command(user_ids):
+    """Recompute training stats from workout_sessions."""
+    rebuild(db.session.connection(), list(user_ids) or None)
+    db.session.commit()
+    click.echo('Training stats rebuilt.')
+
+
+@stats_command.command('check')
+def check_command():
+    """Report training stats rows that disagree with workout_sessions."""
+    mismatches = check(db.session.connection())
+    for table, id, stored, expected in mismatches:
+        click.echo(f'{table} {id}: stored {stored}, expected {expected}')
+    if mismatches:
+        raise click.ClickException(f'{len(mismatches)} rows out of date; '
+                                   'run "flask training-stats rebuild"')
+    click.echo('Training stats are consistent.')
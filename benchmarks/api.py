@@ -0,0 +1,314 @@
+"""
+API benchmark covering every namespace.
+
+Builds ``create_app()`` against a throwaway SQLite database filled by
+``generate_data.py``, then runs a fixed set of requests against each
+namespace:
+
+- through the Flask test client, one scenario at a time, which measures
+  the handler with no network in the way, and
+- through a threaded Werkzeug server started in-process, driven by
+  keep-alive HTTP clients running the whole mix concurrently.
+
+For each scenario it reports p50/p95/p99 latency, throughput and SQL
+statements per request, and prints one JSON document that can be saved
+with ``--output`` and diffed between releases.
+
+Usage:
+    python -m benchmarks.api --sessions 1000000 --users 10000
+    python -m benchmarks.api --mode client --requests 500 --output before.json
+"""
+import argparse
+import http.client
+import itertools
+import json
+import logging
+import os
+import platform
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from contextlib import redirect_stdout
+from datetime import timedelta
+
+
+QUERY_COUNT_HEADER = 'X-Benchmark-Queries'
+
+
+def seed(args):
+    """
+    Fill the database with ``generate_data`` and return
+    ``{user_id: {'plan_id': ..., 'goal_id': ...}}`` for the first
+    `args.active_users` users, whom the scenarios run as.
+    """
+    from sqlalchemy import func, select
+
+    import generate_data
+    from app import db
+    from app.models import ExerciseGoal, User, WorkoutPlan
+
+    # Progress goes to stderr so stdout stays valid JSON.
+    with redirect_stdout(sys.stderr):
+        generate_data.generate(db.session, args.sessions, args.users, args.exercises,
+                               args.seed, password=args.password)
+
+    user_ids = db.session.execute(
+        select(User.id).order_by(User.id).limit(args.active_users)).scalars().all()
+    first_plan = dict(db.session.execute(
+        select(WorkoutPlan.user_id, func.min(WorkoutPlan.id))
+        .where(WorkoutPlan.user_id.in_(user_ids)).group_by(WorkoutPlan.user_id)).all())
+    first_goal = dict(db.session.execute(
+        select(ExerciseGoal.user_id, func.min(ExerciseGoal.id))
+        .where(ExerciseGoal.user_id.in_(user_ids)).group_by(ExerciseGoal.user_id)).all())
+    return {user_id: {'plan_id': first_plan.get(user_id, 0),
+                      'goal_id': first_goal.get(user_id, 0)}
+            for user_id in user_ids}
+
+
+def scenarios(args):
+    """
+    (name, build) pairs; `build` takes a user's context dict and returns
+    the (method, path, json body) to send.
+    """
+    def exercise_id(ctx):
+        return ctx['rng'].randint(1, args.exercises)
+
+    return [
+        ('user.login', lambda ctx: ('POST', '/api/user/login',
+                                    {'username': f"user{ctx['user_id']}",
+                                     'password': args.password})),
+        ('user.profile', lambda ctx: ('GET', '/api/user/profile', None)),
+        ('exercises.list', lambda ctx: ('GET', '/api/exercises', None)),
+        ('exercises.muscle', lambda ctx: ('GET', '/api/exercises?muscle=Chest', None)),
+        ('exercises.search', lambda ctx: ('GET', '/api/exercises/search?q=pre&limit=20', None)),
+        ('exercises.detail', lambda ctx: ('GET', f'/api/exercises/{exercise_id(ctx)}', None)),
+        ('workout_plans.summary', lambda ctx: ('GET', '/api/workout-plans/summary', None)),
+        ('workout_plans.detail', lambda ctx: ('GET', f"/api/workout-plans/{ctx['plan_id']}", None)),
+        ('workout_plans.create', lambda ctx: ('POST', '/api/workout-plans', {
+            'name': 'Benchmark plan', 'frequency': '3x/week', 'session_duration': 45,
+            'selected_exercises': [{'exercise_id': exercise_id(ctx), 'sets': 3, 'reps': 10}
+                                   for _ in range(5)]})),
+        ('workout_plans.exercises',
+         lambda ctx: ('GET', f"/api/workout-plans/{ctx['plan_id']}/exercises", None)),
+        ('exercise_goals.list', lambda ctx: ('GET', '/api/exercise-goals', None)),
+        ('exercise_goals.detail',
+         lambda ctx: ('GET', f"/api/exercise-goals/{ctx['goal_id']}", None)),
+        ('exercise_goals.create', lambda ctx: ('POST', '/api/exercise-goals', {
+            'exercise_id': exercise_id(ctx), 'target_sets': 3, 'target_reps': 10})),
+        ('workout_sessions.list', lambda ctx: ('GET', '/api/workout-sessions', None)),
+        ('workout_sessions.create', lambda ctx: ('POST', '/api/workout-sessions', {
+            'workout_plan_id': ctx['plan_id'], 'duration': 45})),
+        ('fitness_goals.get', lambda ctx: ('GET', '/api/fitness-goals', None)),
+    ]
+
+
+def percentile(samples, pct):
+    if not samples:
+        return None
+    samples = sorted(samples)
+    return round(samples[min(len(samples) - 1, int(len(samples) * pct / 100))] * 1000, 3)
+
+
+def summarize(latencies, queries, errors, elapsed):
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'requests_per_sec': round(len(latencies) / elapsed, 1) if elapsed else None,
+        'p50_ms': percentile(latencies, 50),
+        'p95_ms': percentile(latencies, 95),
+        'p99_ms': percentile(latencies, 99),
+        'queries_per_request': round(sum(queries) / len(queries), 2) if queries else None,
+    }
+
+
+def run_client(app, contexts, args):
+    """Each scenario in turn through the test client, in this thread."""
+    client = app.test_client()
+    results = {}
+    for name, build in scenarios(args):
+        latencies, queries, errors = [], [], 0
+        users = itertools.cycle(contexts)
+        started = time.perf_counter()
+        for _ in range(args.requests):
+            ctx = next(users)
+            method, path, body = build(ctx)
+            start = time.perf_counter()
+            response = client.open(path, method=method, json=body, headers=ctx['headers'])
+            response.get_data()
+            latencies.append(time.perf_counter() - start)
+            queries.append(int(response.headers.get(QUERY_COUNT_HEADER, 0)))
+            if response.status_code >= 500:
+                errors += 1
+        results[name] = summarize(latencies, queries, errors, time.perf_counter() - started)
+    return results
+
+
+def _http_client(port, contexts, mix, stop, results, lock):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    local = {name: ([], [], [0]) for name, _ in mix}
+    users = itertools.cycle(contexts)
+    for name, build in itertools.cycle(mix):
+        if stop.is_set():
+            break
+        ctx = next(users)
+        method, path, body = build(ctx)
+        headers = dict(ctx['headers'])
+        payload = None
+        if body is not None:
+            payload = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+        latencies, queries, errors = local[name]
+        start = time.perf_counter()
+        try:
+            connection.request(method, path, body=payload, headers=headers)
+            response = connection.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            errors[0] += 1
+            connection.close()
+            continue
+        latencies.append(time.perf_counter() - start)
+        queries.append(int(response.getheader(QUERY_COUNT_HEADER, 0)))
+        if response.status >= 500:
+            errors[0] += 1
+    connection.close()
+
+    with lock:
+        for name, (latencies, queries, errors) in local.items():
+            total = results.setdefault(name, ([], [], [0]))
+            total[0].extend(latencies)
+            total[1].extend(queries)
+            total[2][0] += errors[0]
+
+
+def run_http(app, contexts, args):
+    """The whole mix at once over real sockets, from `args.clients` threads."""
+    from werkzeug.serving import make_server
+
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    mix = scenarios(args)
+    stop = threading.Event()
+    lock = threading.Lock()
+    collected = {}
+    clients = []
+    for i in range(args.clients):
+        rotated = mix[i % len(mix):] + mix[:i % len(mix)]
+        clients.append(threading.Thread(
+            target=_http_client,
+            args=(server.port, contexts[i::args.clients] or contexts, rotated,
+                  stop, collected, lock)))
+    started = time.perf_counter()
+    for client in clients:
+        client.start()
+    time.sleep(args.duration)
+    stop.set()
+    for client in clients:
+        client.join()
+    elapsed = time.perf_counter() - started
+    server.shutdown()
+
+    results = {name: summarize(latencies, queries, errors[0], elapsed)
+               for name, (latencies, queries, errors) in sorted(collected.items())}
+    everything = [collected[name] for name in collected]
+    results['total'] = summarize(
+        [sample for latencies, _, _ in everything for sample in latencies],
+        [sample for _, queries, _ in everything for sample in queries],
+        sum(errors[0] for _, _, errors in everything), elapsed)
+    return results
+
+
+def build_app(args, database):
+    os.environ['DATABASE_URL'] = 'sqlite:///' + database
+    os.environ.setdefault('JWT_SECRET_KEY', 'benchmark-secret-key-with-enough-length')
+
+    from flask_jwt_extended import create_access_token
+
+    from app import create_app, db
+    from app.metrics import current_stats
+
+    app = create_app()
+    # Slow request logging would only measure the console.
+    app.config['SLOW_REQUEST_MS'] = float('inf')
+
+    @app.after_request
+    def _report_queries(response):
+        # Runs before the metrics hook, which consumes the stats.
+        stats = current_stats()
+        if stats is not None:
+            response.headers[QUERY_COUNT_HEADER] = str(stats['queries'])
+        return response
+
+    with app.app_context():
+        db.create_all()
+        started = time.perf_counter()
+        users = seed(args)
+        seconds = round(time.perf_counter() - started, 2)
+
+        contexts = []
+        for user_id, ids in users.items():
+            token = create_access_token(identity=str(user_id),
+                                        expires_delta=timedelta(days=1))
+            contexts.append(dict(ids, user_id=user_id,
+                                 rng=random.Random(args.seed + user_id),
+                                 headers={'Authorization': f'Bearer {token}'}))
+    return app, contexts, seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--mode', choices=['client', 'http', 'both'], default='both')
+    parser.add_argument('--sessions', type=int, default=20000,
+                        help='workout sessions to generate')
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--active-users', type=int, default=20,
+                        help='users the requests are spread over')
+    parser.add_argument('--exercises', type=int, default=500)
+    parser.add_argument('--requests', type=int, default=200,
+                        help='requests per scenario in client mode')
+    parser.add_argument('--clients', type=int, default=8, help='HTTP client threads')
+    parser.add_argument('--duration', type=float, default=10, help='seconds of HTTP load')
+    parser.add_argument('--password', default='benchmark-password')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='also write the JSON report to this file')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app, contexts, seed_seconds = build_app(args, os.path.join(tmp, 'benchmark.db'))
+        report = {
+            'config': {key: value for key, value in vars(args).items()
+                       if key not in ('output', 'password')},
+            'environment': {
+                'python': platform.python_version(),
+                'sqlite': sqlite3.sqlite_version,
+                'platform': platform.platform(),
+                'cpus': os.cpu_count(),
+            },
+            'seed_seconds': seed_seconds,
+        }
+        if args.mode in ('client', 'both'):
+            report['client'] = run_client(app, contexts, args)
+        if args.mode in ('http', 'both'):
+            report['http'] = run_http(app, contexts, args)
+
+        from app import db
+        from app.hashing import password_hasher
+        with app.app_context():
+            db.engine.dispose()
+        password_hasher.shutdown()
+
+    output = json.dumps(report, indent=2, sort_keys=True)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+
+
+if __name__ == '__main__':
+    main()
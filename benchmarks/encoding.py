@@ -0,0 +1,101 @@
+"""
+Serialization benchmark for a user's full workout session history.
+
+Generates one user with ``--sessions`` sessions and times building the
+``{"workout_sessions": [...]}`` payload both ways the API can: ORM objects
+with ``to_dict()``, and column rows with ``rows_to_dicts``. Each is
+encoded with every available JSON encoder. Query, dict-building and
+encoding times are reported separately, in milliseconds (median of
+``--repeat`` runs).
+
+Usage:
+    python -m benchmarks.encoding --sessions 10000
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+
+
+def measure(repeat, load, build, dumps):
+    timings = {'query_ms': [], 'build_ms': [], 'encode_ms': []}
+    for _ in range(repeat):
+        start = time.perf_counter()
+        loaded = load()
+        loaded_at = time.perf_counter()
+        payload = {'workout_sessions': build(loaded)}
+        built_at = time.perf_counter()
+        body = dumps(payload)
+        done = time.perf_counter()
+        timings['query_ms'].append(loaded_at - start)
+        timings['build_ms'].append(built_at - loaded_at)
+        timings['encode_ms'].append(done - built_at)
+
+    result = {key: round(statistics.median(values) * 1000, 2)
+              for key, values in timings.items()}
+    result['total_ms'] = round(sum(result.values()), 2)
+    result['bytes'] = len(body)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sessions', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tmp, 'encoding.db')
+        os.environ.setdefault('JWT_SECRET_KEY', 'benchmark-secret-key-with-enough-length')
+
+        import generate_data
+        from app import create_app, db
+        from app.encoding import ResponseEncoder, orjson, rows_to_dicts
+        from app.models import WorkoutSession
+        from app.shapes import WORKOUT_SESSION_COLUMNS
+
+        app = create_app()
+        with app.app_context():
+            db.create_all()
+            with redirect_stdout(sys.stderr):
+                generate_data.generate(db.session, args.sessions, users=1, exercises=20,
+                                       seed=args.seed)
+            user_id = db.session.execute(db.select(WorkoutSession.user_id)).scalar()
+            order = (WorkoutSession.date.desc(), WorkoutSession.id.desc())
+
+            def load_objects():
+                # Fresh objects every run, as in a new request
+                db.session.expunge_all()
+                return WorkoutSession.query.filter_by(user_id=user_id).order_by(*order).all()
+
+            def load_rows():
+                # Fetch everything here so query time is comparable
+                return db.session.execute(db.select(*WORKOUT_SESSION_COLUMNS).where(
+                    WorkoutSession.user_id == user_id).order_by(*order)).freeze()
+
+            paths = {
+                'orm_to_dict': (load_objects, lambda sessions: [s.to_dict() for s in sessions]),
+                'rows': (load_rows, lambda frozen: rows_to_dicts(frozen())),
+            }
+            encoders = ['json'] + (['orjson'] if orjson is not None else [])
+
+            results = {}
+            for path, (load, build) in paths.items():
+                for name in encoders:
+                    encoder = ResponseEncoder()
+                    encoder.configure(name)
+                    results[f'{path}+{name}'] = measure(args.repeat, load, build,
+                                                        encoder.dumps)
+            db.engine.dispose()
+
+    print(json.dumps({'sessions': args.sessions, 'results': results},
+                     indent=2, sort_keys=True))
+
+
+if __name__ == '__main__':
+    main()
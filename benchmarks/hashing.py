@@ -0,0 +1,51 @@
+"""
+Micro-benchmark for password hashing throughput.
+
+Reports hashes/sec for a werkzeug hash method, both in total and per
+worker process, so PASSWORD_HASH_METHOD and PASSWORD_HASH_WORKERS can be
+sized against the login rate we need to absorb.
+
+Usage:
+    python -m benchmarks.hashing --method scrypt --workers 1 2 4 --count 64
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from werkzeug.security import generate_password_hash
+
+
+def run(method, workers, count):
+    with ProcessPoolExecutor(workers) as pool:
+        # Warm the pool so process start-up is not measured.
+        list(pool.map(generate_password_hash, ['warmup'] * workers, [method] * workers))
+
+        start = time.perf_counter()
+        list(pool.map(generate_password_hash, ['benchmark-password'] * count, [method] * count))
+        elapsed = time.perf_counter() - start
+
+    return {
+        'method': method,
+        'workers': workers,
+        'hashes': count,
+        'seconds': round(elapsed, 3),
+        'hashes_per_sec': round(count / elapsed, 2),
+        'hashes_per_sec_per_core': round(count / elapsed / workers, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--method', default=os.getenv('PASSWORD_HASH_METHOD', 'scrypt'))
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, os.cpu_count() or 1])
+    parser.add_argument('--count', type=int, default=32, help='hashes per run')
+    args = parser.parse_args()
+
+    for workers in args.workers:
+        print(json.dumps(run(args.method, workers, args.count)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+"""
+Load test comparing the Werkzeug dev server with ``flask serve``.
+
+Starts each server as a subprocess against a throwaway SQLite database
+seeded from ``exercises.csv``, drives it with keep-alive HTTP clients
+running in threads, and prints requests/sec and latency percentiles.
+
+Usage:
+    python -m benchmarks.load_test --clients 32 --duration 10
+    python -m benchmarks.load_test --servers serve --workers 4 --threads 8
+"""
+import argparse
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def seed_database(url):
+    env = dict(os.environ, DATABASE_URL=url)
+    code = (
+        "from app import db\n"
+        "import load_exercises\n"
+        "db.create_all()\n"
+        "load_exercises.load_exercises_from_csv('exercises.csv')\n"
+    )
+    subprocess.run([sys.executable, '-c', code], cwd=ROOT, env=env, check=True,
+                   stdout=subprocess.DEVNULL)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(kind, port, url, args):
+    env = dict(os.environ, DATABASE_URL=url)
+    command = [sys.executable, '-m', 'flask', '--app', 'app:create_app']
+    if kind == 'dev':
+        command += ['run', '--port', str(port), '--no-reload', '--no-debugger']
+    else:
+        command += ['serve', '--bind', f'127.0.0.1:{port}',
+                    '--workers', str(args.workers), '--threads', str(args.threads)]
+    process = subprocess.Popen(command, cwd=ROOT, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f'{kind} server did not start')
+
+
+def client_loop(port, paths, stop, latencies, errors):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    i = 0
+    while not stop.is_set():
+        path = paths[i % len(paths)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            connection.request('GET', path)
+            response = connection.getresponse()
+            response.read()
+            if response.status >= 500:
+                errors.append(response.status)
+            if response.will_close:
+                connection.close()
+        except (OSError, http.client.HTTPException):
+            errors.append('connection')
+            connection.close()
+            continue
+        latencies.append(time.perf_counter() - start)
+    connection.close()
+
+
+def percentile(samples, pct):
+    if not samples:
+        return None
+    samples = sorted(samples)
+    return round(samples[min(len(samples) - 1, int(len(samples) * pct / 100))] * 1000, 2)
+
+
+def run(kind, url, args):
+    port = free_port()
+    process = start_server(kind, port, url, args)
+    try:
+        stop = threading.Event()
+        latencies, errors = [], []
+        threads = [threading.Thread(target=client_loop,
+                                    args=(port, args.paths, stop, latencies, errors))
+                   for _ in range(args.clients)]
+        for thread in threads:
+            thread.start()
+        time.sleep(args.duration)
+        stop.set()
+        for thread in threads:
+            thread.join()
+    finally:
+        process.terminate()
+        process.wait()
+
+    return {
+        'server': kind,
+        'clients': args.clients,
+        'requests': len(latencies),
+        'errors': len(errors),
+        'requests_per_sec': round(len(latencies) / args.duration, 1),
+        'p50_ms': percentile(latencies, 50),
+        'p95_ms': percentile(latencies, 95),
+        'p99_ms': percentile(latencies, 99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--servers', nargs='+', choices=['dev', 'serve'], default=['dev', 'serve'])
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10, help='seconds per server')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--paths', nargs='+', default=['/api/exercises', '/api/exercises/1'])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = 'sqlite:///' + os.path.join(tmp, 'load_test.db')
+        seed_database(url)
+        for kind in args.servers:
+            print(json.dumps(run(kind, url, args)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Latency benchmark for the in-memory exercise search index.
+
+Builds an ``ExerciseIndex`` over a synthetic catalog and reports per-query
+latency percentiles for a mix of prefix, filter and facet queries.
+
+Usage:
+    python -m benchmarks.search --exercises 100000
+"""
+import argparse
+import json
+import random
+import time
+
+from app.search import ExerciseIndex
+
+
+MUSCLES = ['Chest', 'Back', 'Shoulders', 'Biceps', 'Triceps', 'Quads', 'Hamstrings',
+           'Glutes', 'Calves', 'Core', 'Forearms', 'Lats', 'Traps', 'Obliques']
+WORDS = ['barbell', 'dumbbell', 'cable', 'machine', 'kettlebell', 'press', 'row', 'curl',
+         'squat', 'lunge', 'deadlift', 'raise', 'fly', 'pulldown', 'extension', 'incline',
+         'decline', 'seated', 'standing', 'single', 'arm', 'leg', 'reverse', 'close', 'wide']
+
+QUERIES = [
+    {'q': 'press'},
+    {'q': 'dumb'},
+    {'q': 'incline dumbbell press'},
+    {'q': 'sq', 'difficulty': 2},
+    {'muscles': ['Chest']},
+    {'muscles': ['Hamstrings', 'Glutes'], 'difficulty': 3},
+    {},
+]
+
+
+def synthetic_catalog(count, seed):
+    rng = random.Random(seed)
+    for id in range(1, count + 1):
+        name = ' '.join(rng.sample(WORDS, 3)) + f' {id}'
+        yield {
+            'id': id,
+            'name': name.title(),
+            'description': ' '.join(rng.choices(WORDS, k=12)),
+            'instructions': '',
+            'target_muscles': ', '.join(rng.sample(MUSCLES, rng.randint(1, 3))),
+            'difficulty': rng.randint(1, 3),
+        }
+
+
+def percentile(samples, pct):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--exercises', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index = ExerciseIndex(synthetic_catalog(args.exercises, args.seed))
+    build = time.perf_counter() - start
+
+    results = {'exercises': args.exercises, 'build_seconds': round(build, 3), 'queries': []}
+    for query in QUERIES:
+        samples = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            total, _, _ = index.search(**query)
+            samples.append((time.perf_counter() - start) * 1000)
+        results['queries'].append({
+            'query': query,
+            'total': total,
+            'p50_ms': round(percentile(samples, 50), 3),
+            'p99_ms': round(percentile(samples, 99), 3),
+        })
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
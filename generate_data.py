@@ -0,0 +1,266 @@
+"""
+Generate a large synthetic dataset for load and scaling tests.
+
+Adds users with profiles, fitness goals, workout plans with their
+exercises, exercise goals and workout sessions on top of whatever is in
+the database. Activity follows a long tail: a few users log thousands of
+sessions while most log a handful. The same ``--seed`` and sizes always
+produce the same rows, and everything is written with Core bulk inserts
+committed in chunks.
+
+Exercises come from the existing catalog (run ``load_exercises.py``
+first), optionally topped up with ``--exercises`` synthetic ones.
+
+Usage:
+    python generate_data.py --sessions 2000000
+    python generate_data.py --sessions 50000 --users 200 --exercises 500 --seed 7
+"""
+import argparse
+import itertools
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert, select
+
+from app import db
+from app.catalog import bump_catalog_version
+from app.hashing import password_hasher
+from app.models import (User, UserProfile, FitnessGoal, Exercises, ExerciseGoal,
+                        WorkoutPlan, SelectedExercise, WorkoutSession, link_muscles)
+from app.training_stats import rebuild as rebuild_training_stats
+
+
+DEFAULT_SESSIONS = 1000000
+# Average sessions per user, used when --users is not given
+SESSIONS_PER_USER = 100
+DEFAULT_CHUNK_SIZE = 20000
+DEFAULT_PASSWORD = 'password123'
+
+# Sessions are spread over the two years before this date; it is fixed so
+# the output does not depend on when the script runs.
+END_DATE = datetime(2025, 1, 1)
+HISTORY_DAYS = 730
+
+# Shape of the activity tail; lower is more skewed. Weights are capped so
+# the busiest users log about MAX_ACTIVITY / 6 times the average.
+PARETO_ALPHA = 1.2
+MAX_ACTIVITY = 100
+
+MUSCLES = ['Chest', 'Back', 'Shoulders', 'Biceps', 'Triceps', 'Quads', 'Hamstrings',
+           'Glutes', 'Calves', 'Core', 'Forearms', 'Lats', 'Traps', 'Obliques']
+WORDS = ['barbell', 'dumbbell', 'cable', 'machine', 'kettlebell', 'press', 'row', 'curl',
+         'squat', 'lunge', 'deadlift', 'raise', 'fly', 'pulldown', 'extension', 'incline',
+         'decline', 'seated', 'standing', 'single', 'arm', 'leg', 'reverse', 'close', 'wide']
+PLAN_NAMES = ['Push', 'Pull', 'Legs', 'Upper Body', 'Lower Body', 'Full Body', 'Strength',
+              'Hypertrophy', 'Conditioning', 'Mobility']
+NOTES = ['Felt strong', 'Tired today', 'New PR', 'Short on time', 'Deload week',
+         'Great pump', 'Form check needed']
+
+
+def _next_id(session, model):
+    return (session.execute(select(func.max(model.id))).scalar() or 0) + 1
+
+
+def _insert(session, model, rows, chunk_size):
+    """Insert `rows` in chunks of `chunk_size`, committing each chunk."""
+    count = 0
+    start = time.perf_counter()
+    rows = iter(rows)
+    while chunk := list(itertools.islice(rows, chunk_size)):
+        session.execute(insert(model.__table__), chunk)
+        session.commit()
+        count += len(chunk)
+        elapsed = time.perf_counter() - start
+        print(f"{model.__tablename__}: {count} rows, {count / elapsed:.0f} rows/s")
+    return count
+
+
+def _split(total, weights, rng):
+    """Split `total` into integer shares proportional to `weights`."""
+    scale = total / sum(weights)
+    shares = [int(weight * scale) for weight in weights]
+    for index in rng.choices(range(len(weights)), weights=weights,
+                             k=total - sum(shares)):
+        shares[index] += 1
+    return shares
+
+
+def _synthetic_exercises(first_id, count, rng):
+    for id in range(first_id, first_id + count):
+        yield {
+            'id': id,
+            'name': ' '.join(rng.sample(WORDS, 3)).title() + f' {id}',
+            'description': ' '.join(rng.choices(WORDS, k=12)),
+            'instructions': ' '.join(rng.choices(WORDS, k=20)),
+            'target_muscles': ', '.join(rng.sample(MUSCLES, rng.randint(1, 3))),
+            'difficulty': rng.randint(1, 3),
+        }
+
+
+def generate(session, sessions=DEFAULT_SESSIONS, users=None, exercises=0, seed=1,
+             chunk_size=DEFAULT_CHUNK_SIZE, password=DEFAULT_PASSWORD):
+    """
+    Add about `sessions` workout sessions spread over `users` new users
+    (``sessions / SESSIONS_PER_USER`` by default), plus `exercises`
+    synthetic catalog entries.
+
+    Every user gets at least one plan; their password is `password`.
+    Returns the number of rows inserted per table.
+    """
+    if users is None:
+        users = max(1, sessions // SESSIONS_PER_USER)
+    # Separate streams keep each table stable when another one's
+    # parameters change.
+    streams = {name: random.Random(f'{seed}-{name}') for name in (
+        'exercises', 'users', 'activity', 'plans', 'goals', 'sessions')}
+    counts = {}
+
+    if exercises:
+        first_id = _next_id(session, Exercises)
+        new_exercises = list(_synthetic_exercises(first_id, exercises, streams['exercises']))
+        counts['exercises'] = _insert(session, Exercises, new_exercises, chunk_size)
+        link_muscles(session.connection(), [(row['id'], row['target_muscles'])
+                                            for row in new_exercises])
+        # Core inserts skip the flush hooks, so invalidate API caches here
+        bump_catalog_version(session.connection())
+        session.commit()
+
+    exercise_ids = session.execute(
+        select(Exercises.id).order_by(Exercises.id)).scalars().all()
+    if not exercise_ids:
+        raise ValueError("The exercise catalog is empty; load exercises first "
+                         "or pass --exercises")
+    # A few exercises are far more popular than the rest.
+    popularity = list(itertools.accumulate(1 / rank for rank in range(1, len(exercise_ids) + 1)))
+
+    def pick_exercises(rng, count):
+        return set(rng.choices(exercise_ids, cum_weights=popularity, k=count))
+
+    first_user = _next_id(session, User)
+    user_ids = range(first_user, first_user + users)
+    # Hashing is deliberately slow, so every user shares one password hash.
+    password_hash = password_hasher.hash(password)
+
+    user_rng = streams['users']
+    counts['users'] = _insert(session, User, ({
+        'id': id, 'username': f'user{id}', 'password': password_hash,
+    } for id in user_ids), chunk_size)
+    counts['user_profiles'] = _insert(session, UserProfile, ({
+        'user_id': id,
+        'current_weight': round(user_rng.gauss(78, 14), 1),
+        'height': round(user_rng.gauss(174, 9), 1),
+        'age': user_rng.randint(16, 75),
+        'body_fat_percentage': round(user_rng.uniform(8, 35), 1),
+        'muscle_mass': round(user_rng.uniform(25, 45), 1),
+    } for id in user_ids if user_rng.random() < 0.85), chunk_size)
+    counts['fitness_goals'] = _insert(session, FitnessGoal, ({
+        'user_id': id,
+        'target_weight': round(user_rng.gauss(75, 12), 1),
+        'target_muscle_mass': round(user_rng.uniform(28, 48), 1),
+        'target_body_fat_percentage': round(user_rng.uniform(8, 25), 1),
+    } for id in user_ids if user_rng.random() < 0.6), chunk_size)
+
+    activity = [min(MAX_ACTIVITY, streams['activity'].paretovariate(PARETO_ALPHA))
+                for _ in user_ids]
+    session_counts = _split(sessions, activity, streams['activity'])
+
+    # Heavier users keep more plans; plan ids are handed out in user order.
+    plan_rng = streams['plans']
+    first_plan = _next_id(session, WorkoutPlan)
+    plan_durations = []
+    user_plans = []
+    for count in session_counts:
+        plans = min(10, 1 + int(plan_rng.expovariate(1.5) + count / 400))
+        user_plans.append((first_plan + len(plan_durations), plans))
+        plan_durations.extend(plan_rng.choice([30, 45, 60, 75, 90]) for _ in range(plans))
+
+    def plan_rows():
+        for user_id, (first, plans) in zip(user_ids, user_plans):
+            for id in range(first, first + plans):
+                yield {
+                    'id': id,
+                    'user_id': user_id,
+                    'name': plan_rng.choice(PLAN_NAMES),
+                    'frequency': f'{plan_rng.randint(2, 6)}x/week',
+                    'session_duration': plan_durations[id - first_plan],
+                }
+
+    def selected_rows():
+        for id in range(first_plan, first_plan + len(plan_durations)):
+            for exercise_id in pick_exercises(plan_rng, plan_rng.randint(4, 10)):
+                yield {
+                    'workout_plan_id': id,
+                    'exercise_id': exercise_id,
+                    'sets': plan_rng.randint(2, 5),
+                    'reps': plan_rng.choice([5, 6, 8, 10, 12, 15]),
+                }
+
+    counts['workout_plans'] = _insert(session, WorkoutPlan, plan_rows(), chunk_size)
+    counts['selected_exercises'] = _insert(session, SelectedExercise, selected_rows(),
+                                           chunk_size)
+
+    goal_rng = streams['goals']
+    counts['exercise_goals'] = _insert(session, ExerciseGoal, ({
+        'user_id': user_id,
+        'exercise_id': exercise_id,
+        'target_sets': goal_rng.randint(3, 5),
+        'target_reps': goal_rng.choice([5, 8, 10, 12]),
+    } for user_id in user_ids
+        for exercise_id in pick_exercises(goal_rng, int(goal_rng.expovariate(0.25)))), chunk_size)
+
+    session_rng = streams['sessions']
+
+    def session_rows():
+        for user_id, (first, plans), count in zip(user_ids, user_plans, session_counts):
+            # Each user started somewhere in the history window, busier
+            # users longer ago.
+            span = session_rng.randint(min(HISTORY_DAYS, 7 + count // 2),
+                                       HISTORY_DAYS) * 86400
+            start = END_DATE - timedelta(seconds=span)
+            for offset in sorted(session_rng.randrange(span) for _ in range(count)):
+                plan_id = first + session_rng.randrange(plans)
+                planned = plan_durations[plan_id - first_plan]
+                yield {
+                    'workout_plan_id': plan_id,
+                    'user_id': user_id,
+                    'date': start + timedelta(seconds=offset),
+                    'duration': max(10, int(session_rng.gauss(planned, planned / 5))),
+                    'notes': session_rng.choice(NOTES) if session_rng.random() < 0.1 else None,
+                }
+
+    counts['workout_sessions'] = _insert(session, WorkoutSession, session_rows(),
+                                         chunk_size)
+    # Likewise for the training summary tables; one set-based pass over
+    # all users is cheaper than a long IN list of the new ones.
+    rebuild_training_stats(session.connection())
+    session.commit()
+    return counts
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sessions', type=int, default=DEFAULT_SESSIONS,
+                        help='target number of workout sessions')
+    parser.add_argument('--users', type=int,
+                        help=f'users to create  [default: sessions / {SESSIONS_PER_USER}]')
+    parser.add_argument('--exercises', type=int, default=0,
+                        help='synthetic exercises to add to the catalog')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help='rows per INSERT and commit')
+    parser.add_argument('--password', default=DEFAULT_PASSWORD,
+                        help='password for every generated user')
+    args = parser.parse_args()
+
+    from app import create_app
+
+    app = create_app()
+    with app.app_context():
+        started = time.perf_counter()
+        counts = generate(db.session, args.sessions, args.users, args.exercises,
+                          args.seed, args.chunk_size, args.password)
+        elapsed = time.perf_counter() - started
+        for table, count in counts.items():
+            print(f"{table}: {count}")
+        print(f"Generated {sum(counts.values())} rows in {elapsed:.1f}s")
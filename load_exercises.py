@@ -1,7 +1,12 @@
+import argparse
 import csv
+import itertools
 import os
-from app.models import Exercises
+import time
+from sqlalchemy import insert, select
+from app.models import Exercises, link_muscles
 from app import create_app, db
+from app.catalog import bump_catalog_version
 
 # Create the Flask app and database context
 app = create_app()
@@ -10,10 +15,76 @@ app.app_context().push()
 # Path to the CSV file
 CSV_FILE_PATH = 'exercises.csv'
 
-def load_exercises_from_csv(file_path):
+# Rows read, checked and committed per round trip
+DEFAULT_BATCH_SIZE = 1000
+
+
+def _parse_rows(reader):
+    """
+    Yield validated exercise mappings from the CSV reader, skipping rows
+    with an invalid difficulty.
+    """
+    for row in reader:
+        # Validate difficulty
+        try:
+            difficulty = int(row['difficulty'])
+            if not (1 <= difficulty <= 3):
+                raise ValueError("Difficulty must be between 1 and 5")
+        except ValueError:
+            print(f"Invalid difficulty value for {row['name']}: {row['difficulty']}")
+            continue
+
+        yield {
+            'name': row['name'],
+            'description': row.get('description', ''),
+            'instructions': row.get('instructions', ''),
+            'target_muscles': row.get('target_muscles', ''),
+            'difficulty': difficulty
+        }
+
+
+def _insert_batch(batch):
+    """
+    Insert the exercises in `batch` that are not in the table yet, using one
+    query to find existing names and one executemany INSERT, then link the
+    new rows to their muscles.
+
+    Returns the number of rows inserted.
+    """
+    names = {row['name'] for row in batch}
+    existing = set(db.session.execute(
+        select(Exercises.name).where(Exercises.name.in_(names))).scalars())
+
+    new_rows = []
+    for row in batch:
+        if row['name'] in existing:
+            continue
+        # Also drop repeats within the same batch
+        existing.add(row['name'])
+        new_rows.append(row)
+
+    if new_rows:
+        db.session.execute(insert(Exercises.__table__), new_rows)
+        inserted = db.session.execute(
+            select(Exercises.id, Exercises.target_muscles)
+            .where(Exercises.name.in_([row['name'] for row in new_rows])))
+        link_muscles(db.session.connection(), inserted.all())
+        # Core inserts skip the flush hooks, so invalidate API caches here
+        bump_catalog_version(db.session.connection())
+    db.session.commit()
+
+    return len(new_rows)
+
+
+def load_exercises_from_csv(file_path, batch_size=DEFAULT_BATCH_SIZE):
     """
     Load data from a CSV file and insert it into the Exercises table.
     Handles errors and checks for existing entries.
+
+    The file is streamed in batches of `batch_size` rows and each batch is
+    committed on its own, so memory use does not grow with the file size.
+    If a batch fails, the batches before it stay committed and re-running
+    the import skips them.
     """
     try:
         # Check if file exists
@@ -22,58 +93,52 @@ def load_exercises_from_csv(file_path):
 
         with open(file_path, mode='r', newline='', encoding='utf-8') as csvfile:
             reader = csv.DictReader(csvfile)
-            
+
             # Check required columns
             required_columns = ['name', 'difficulty']
             for col in required_columns:
                 if col not in reader.fieldnames:
                     raise ValueError(f"Missing required column: {col}")
 
-            exercises_data = []
-            existing_count = 0
+            rows = _parse_rows(reader)
+            processed = 0
             new_count = 0
+            start = time.perf_counter()
+
+            while True:
+                batch = list(itertools.islice(rows, batch_size))
+                if not batch:
+                    break
+
+                new_count += _insert_batch(batch)
+                processed += len(batch)
 
-            for row in reader:
-                # Check if exercise already exists
-                if Exercises.query.filter_by(name=row['name']).first():
-                    existing_count += 1
-                    continue
-
-                # Validate difficulty
-                try:
-                    difficulty = int(row['difficulty'])
-                    if not (1 <= difficulty <= 3):
-                        raise ValueError("Difficulty must be between 1 and 5")
-                except ValueError:
-                    print(f"Invalid difficulty value for {row['name']}: {row['difficulty']}")
-                    continue
-
-                exercises_data.append({
-                    'name': row['name'],
-                    'description': row.get('description', ''),
-                    'instructions': row.get('instructions', ''),
-                    'target_muscles': row.get('target_muscles', ''),
-                    'difficulty': difficulty
-                })
-
-                new_count += 1
-
-            # Bulk insert in batches
-            if exercises_data:
-                db.session.bulk_insert_mappings(Exercises, exercises_data)
-                db.session.commit()
+                elapsed = time.perf_counter() - start
+                print(f"Processed {processed} rows ({new_count} new), "
+                      f"{processed / elapsed:.0f} rows/s")
 
+            elapsed = time.perf_counter() - start
             print(f"Successfully added {new_count} new exercises")
-            print(f"Skipped {existing_count} duplicate exercises")
+            print(f"Skipped {processed - new_count} duplicate exercises")
+            if processed:
+                print(f"Imported {processed} rows in {elapsed:.2f}s "
+                      f"({processed / elapsed:.0f} rows/s)")
 
     except Exception as e:
         db.session.rollback()
         print(f"Error loading exercises: {str(e)}")
         raise
 
+
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Load exercises from a CSV file.')
+    parser.add_argument('file_path', nargs='?', default=CSV_FILE_PATH)
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help='rows checked and committed per batch')
+    args = parser.parse_args()
+
     try:
-        load_exercises_from_csv(CSV_FILE_PATH)
+        load_exercises_from_csv(args.file_path, args.batch_size)
         print("Exercise loading process completed successfully!")
     except Exception as e:
-        print(f"Failed to load exercises: {str(e)}")
\ No newline at end of file
+        print(f"Failed to load exercises: {str(e)}")
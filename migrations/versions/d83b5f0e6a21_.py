@@ -0,0 +1,66 @@
+"""add updated_at to synced tables and sync_tombstones
+
+Revision ID: d83b5f0e6a21
+Revises: b6d2e9f47c15
+Create Date: 2025-02-19 10:05:47.331902
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd83b5f0e6a21'
+down_revision = 'b6d2e9f47c15'
+branch_labels = None
+depends_on = None
+
+
+# table -> owner column of its (owner, updated_at) index
+SYNCED_TABLES = {
+    'fitness_goals': 'user_id',
+    'exercise_goals': 'user_id',
+    'workout_plans': 'user_id',
+    'selected_exercises': 'workout_plan_id',
+    'workout_sessions': 'user_id',
+}
+
+
+def upgrade():
+    # Existing rows count as changed now, so the first delta sync of an
+    # upgraded database returns everything once.
+    now = datetime.utcnow()
+    for table, owner in SYNCED_TABLES.items():
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+        op.execute(sa.table(table, sa.column('updated_at', sa.DateTime()))
+                   .update().values(updated_at=now))
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.alter_column('updated_at', existing_type=sa.DateTime(), nullable=False)
+            batch_op.create_index(f'ix_{table}_{owner}_updated_at', [owner, 'updated_at'], unique=False)
+
+    op.create_table('sync_tombstones',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('table_name', sa.String(length=50), nullable=False),
+    sa.Column('row_id', sa.Integer(), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('sync_tombstones', schema=None) as batch_op:
+        batch_op.create_index('ix_sync_tombstones_user_id_deleted_at', ['user_id', 'deleted_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('sync_tombstones', schema=None) as batch_op:
+        batch_op.drop_index('ix_sync_tombstones_user_id_deleted_at')
+
+    op.drop_table('sync_tombstones')
+
+    for table, owner in reversed(SYNCED_TABLES.items()):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_index(f'ix_{table}_{owner}_updated_at')
+            batch_op.drop_column('updated_at')
@@ -0,0 +1,85 @@
+"""GET /api/workout-plans/<id> must not issue a query per selected exercise."""
+import pytest
+from sqlalchemy import event
+
+
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.setenv('DATABASE_URL', 'sqlite://')
+    monkeypatch.setenv('JWT_SECRET_KEY', 'test-secret-key-of-at-least-32-bytes')
+    monkeypatch.setenv('PASSWORD_HASH_WORKERS', '0')
+    monkeypatch.setenv('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:1000')
+
+    from app import create_app, db
+    from app.models import Exercises
+
+    app = create_app()
+    app.config['TESTING'] = True
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([
+            Exercises(name=f'Exercise {i}', description='d', instructions='i',
+                      target_muscles='Chest', difficulty=1)
+            for i in range(20)])
+        db.session.commit()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def auth(client):
+    credentials = {'username': 'alice', 'password': 'password123'}
+    client.post('/api/user/register', json=credentials)
+    token = client.post('/api/user/login', json=credentials).get_json()['access_token']
+    return {'Authorization': f'Bearer {token}'}
+
+
+def create_plan(client, auth, exercise_count):
+    response = client.post('/api/workout-plans', headers=auth, json={
+        'name': f'{exercise_count} exercises',
+        'selected_exercises': [{'exercise_id': id, 'sets': 3, 'reps': 10}
+                               for id in range(1, exercise_count + 1)],
+    })
+    assert response.status_code == 201
+    return response.get_json()['workout_plan']['id']
+
+
+def count_queries(app, request):
+    from app import db
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        response = request()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    return response, len(statements)
+
+
+def test_get_plan_query_count_is_constant(app, client, auth):
+    small = create_plan(client, auth, 1)
+    large = create_plan(client, auth, 20)
+    # Warm the per-process user and catalog version caches.
+    client.get(f'/api/workout-plans/{small}', headers=auth)
+
+    response, small_count = count_queries(
+        app, lambda: client.get(f'/api/workout-plans/{small}', headers=auth))
+    assert response.status_code == 200
+
+    response, large_count = count_queries(
+        app, lambda: client.get(f'/api/workout-plans/{large}', headers=auth))
+    assert response.status_code == 200
+    assert len(response.get_json()['selected_exercises']) == 20
+
+    assert large_count == small_count
+    assert large_count <= 5